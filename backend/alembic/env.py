@@ -13,6 +13,8 @@ from app.utils.database import Base
 from app.models.user import User
 from app.models.loan import Loan
 from app.models.transaction import Transaction
+from app.models.webhook_event import WebhookEvent
+from app.models.portfolio import PortfolioDaily
 
 config = context.config
 
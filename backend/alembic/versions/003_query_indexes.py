@@ -0,0 +1,39 @@
+"""Indexes for loan and transaction access paths
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_LOAN = "status IN ('pending', 'approved', 'disbursed')"
+
+
+def upgrade() -> None:
+    op.create_index('ix_loans_user_id_status', 'loans', ['user_id', 'status'], unique=False)
+    op.create_index('ix_loans_user_id_created_at', 'loans', ['user_id', 'created_at'], unique=False)
+    op.create_index(
+        'ix_transactions_loan_id_created_at', 'transactions', ['loan_id', 'created_at'], unique=False
+    )
+    # Fails if a user already holds more than one active loan; resolve those rows first
+    op.create_index(
+        'uq_loans_one_active_per_user', 'loans', ['user_id'], unique=True,
+        postgresql_where=sa.text(ACTIVE_LOAN),
+        sqlite_where=sa.text(ACTIVE_LOAN)
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_loans_one_active_per_user', table_name='loans')
+    op.drop_index('ix_transactions_loan_id_created_at', table_name='transactions')
+    op.drop_index('ix_loans_user_id_created_at', table_name='loans')
+    op.drop_index('ix_loans_user_id_status', table_name='loans')
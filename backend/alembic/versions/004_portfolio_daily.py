@@ -0,0 +1,44 @@
+"""Portfolio summary table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('portfolio_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('loan_count', sa.Integer(), nullable=False),
+        sa.Column('principal', sa.BigInteger(), nullable=False),
+        sa.Column('fees', sa.BigInteger(), nullable=False),
+        sa.Column('total', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('day', 'status')
+    )
+    # Populate from existing loans; afterwards the API keeps it current.
+    # SQLite already stores created_at as UTC text.
+    if op.get_bind().dialect.name == "postgresql":
+        day = "date(timezone('UTC', created_at))"
+    else:
+        day = "date(created_at)"
+    op.execute(
+        "INSERT INTO portfolio_daily (day, status, loan_count, principal, fees, total) "
+        f"SELECT {day}, status, count(*), sum(amount), sum(fee), sum(total) "
+        "FROM loans GROUP BY 1, 2"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('portfolio_daily')
@@ -0,0 +1,45 @@
+"""Indexes for the overdue-loan sweeper
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_LOAN = "status IN ('pending', 'approved', 'disbursed')"
+UNREPAID_LOAN = "status IN ('pending', 'approved', 'disbursed', 'overdue', 'defaulted')"
+SWEEPABLE_LOAN = "status IN ('approved', 'disbursed', 'overdue')"
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_loans_open_status_id', 'loans', ['status', 'id'], unique=False,
+        postgresql_where=sa.text(SWEEPABLE_LOAN),
+        sqlite_where=sa.text(SWEEPABLE_LOAN)
+    )
+    # Overdue and defaulted loans keep blocking a new application
+    op.drop_index('uq_loans_one_active_per_user', table_name='loans')
+    op.create_index(
+        'uq_loans_one_active_per_user', 'loans', ['user_id'], unique=True,
+        postgresql_where=sa.text(UNREPAID_LOAN),
+        sqlite_where=sa.text(UNREPAID_LOAN)
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_loans_one_active_per_user', table_name='loans')
+    op.create_index(
+        'uq_loans_one_active_per_user', 'loans', ['user_id'], unique=True,
+        postgresql_where=sa.text(ACTIVE_LOAN),
+        sqlite_where=sa.text(ACTIVE_LOAN)
+    )
+    op.drop_index('ix_loans_open_status_id', table_name='loans')
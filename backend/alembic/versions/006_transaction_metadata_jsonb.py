@@ -0,0 +1,94 @@
+"""Native JSONB transaction metadata with a GIN index
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+# Metadata was json.dumps()ed and then encoded again by the JSON column, so most
+# rows hold a JSON string whose text is the object; unwrap those
+UNWRAP_POSTGRESQL = (
+    "CASE WHEN jsonb_typeof(transaction_metadata::jsonb) = 'string' "
+    "THEN (transaction_metadata::jsonb #>> '{}')::jsonb "
+    "ELSE transaction_metadata::jsonb END"
+)
+UNWRAP_SQLITE = "json_extract(transaction_metadata, '$')"
+DOUBLE_ENCODED_SQLITE = "json_valid(transaction_metadata) AND json_type(transaction_metadata) = 'text'"
+
+
+def _backfill(statement: str, low: int, high: int) -> None:
+    """Run statement over id ranges of BACKFILL_BATCH_SIZE, committing each one"""
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for batch_low in range(low, high, BACKFILL_BATCH_SIZE):
+            bind.execute(sa.text(statement), {"low": batch_low, "high": min(batch_low + BACKFILL_BATCH_SIZE, high)})
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    max_id = bind.scalar(sa.text("SELECT max(id) FROM transactions")) or 0
+
+    if bind.dialect.name != "postgresql":
+        # SQLite stores JSON as text either way; only the double encoding needs undoing
+        _backfill(
+            f"UPDATE transactions SET transaction_metadata = {UNWRAP_SQLITE} "
+            f"WHERE id > :low AND id <= :high AND {DOUBLE_ENCODED_SQLITE}",
+            0, max_id
+        )
+        op.create_index('ix_transactions_created_at_id', 'transactions', ['created_at', 'id'], unique=False)
+        return
+
+    # Fill a new column in short transactions so writers are never blocked for long
+    op.add_column('transactions', sa.Column('metadata_jsonb', postgresql.JSONB(), nullable=True))
+    backfill = (
+        f"UPDATE transactions SET metadata_jsonb = {UNWRAP_POSTGRESQL} "
+        "WHERE id > :low AND id <= :high AND transaction_metadata IS NOT NULL"
+    )
+    _backfill(backfill, 0, max_id)
+
+    # Metadata is never updated, so only rows inserted since need converting before the swap
+    op.execute("LOCK TABLE transactions IN EXCLUSIVE MODE")
+    op.execute(sa.text(backfill).bindparams(low=max_id, high=2 ** 31 - 1))
+    op.drop_column('transactions', 'transaction_metadata')
+    op.alter_column('transactions', 'metadata_jsonb', new_column_name='transaction_metadata')
+
+    with op.get_context().autocommit_block():
+        # Newest-first search pages for filters too broad for the GIN index to pay off
+        op.create_index(
+            'ix_transactions_created_at_id', 'transactions', ['created_at', 'id'], unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_transactions_metadata', 'transactions', ['transaction_metadata'], unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'transaction_metadata': 'jsonb_path_ops'},
+            postgresql_concurrently=True
+        )
+    # Statistics for the new column, so the planner picks the index for selective filters
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_created_at_id', table_name='transactions')
+    # Rows keep their unwrapped form; the old code only ever wrote this column
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index('ix_transactions_metadata', table_name='transactions')
+    op.alter_column(
+        'transactions', 'transaction_metadata',
+        type_=sa.String(length=1000),
+        postgresql_using='transaction_metadata::text'
+    )
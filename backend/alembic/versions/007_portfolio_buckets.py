@@ -0,0 +1,40 @@
+"""Split portfolio_daily rows into buckets
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing totals become bucket 0; writers spread over the others from now on
+    with op.batch_alter_table('portfolio_daily') as batch_op:
+        batch_op.add_column(sa.Column('bucket', sa.SmallInteger(), server_default='0', nullable=False))
+        if op.get_bind().dialect.name == "postgresql":
+            # SQLite's copy of the table replaces its unnamed primary key instead
+            batch_op.drop_constraint('portfolio_daily_pkey', type_='primary')
+        batch_op.create_primary_key('portfolio_daily_pkey', ['day', 'status', 'bucket'])
+
+
+def downgrade() -> None:
+    # Fold every bucket back into one row per (day, status)
+    op.execute(
+        "INSERT INTO portfolio_daily (day, status, bucket, loan_count, principal, fees, total) "
+        "SELECT day, status, -1, sum(loan_count), sum(principal), sum(fees), sum(total) "
+        "FROM portfolio_daily GROUP BY day, status"
+    )
+    op.execute("DELETE FROM portfolio_daily WHERE bucket <> -1")
+    with op.batch_alter_table('portfolio_daily') as batch_op:
+        batch_op.drop_constraint('portfolio_daily_pkey', type_='primary')
+        batch_op.drop_column('bucket')
+        batch_op.create_primary_key('portfolio_daily_pkey', ['day', 'status'])
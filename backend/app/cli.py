@@ -0,0 +1,96 @@
+"""
+Operational commands.
+
+    python -m app.cli reconcile --older-than 15
+    python -m app.cli portfolio-rebuild --check
+    python -m app.cli sweep-loans
+    python -m app.cli rescore-limits
+"""
+import argparse
+import asyncio
+import json
+
+async def _reconcile(args) -> None:
+    from app.services.paystack_service import paystack_service
+    from app.services.reconciliation import reconcile_pending
+    from app.utils.database import async_engine
+    
+    await paystack_service.start()
+    try:
+        report = await reconcile_pending(
+            older_than_minutes=args.older_than,
+            page_size=args.page_size,
+            concurrency=args.concurrency
+        )
+    finally:
+        await paystack_service.close()
+        await async_engine.dispose()
+    print(json.dumps(report.summary(), indent=2))
+
+async def _portfolio_rebuild(args) -> None:
+    from app.services.portfolio import rebuild_portfolio
+    from app.utils.database import AsyncSessionLocal, async_engine
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            drift = await rebuild_portfolio(db, check_only=args.check)
+            await db.commit()
+    finally:
+        await async_engine.dispose()
+    print(json.dumps({"rebuilt": not args.check, "drifted_rows": len(drift), "drift": drift}, indent=2))
+    if args.check and drift:
+        raise SystemExit(1)
+
+async def _sweep_loans(args) -> None:
+    from app.services.loan_sweeper import sweep_loans
+    from app.utils.database import async_engine
+    
+    try:
+        report = await sweep_loans(chunk_size=args.chunk_size)
+    finally:
+        await async_engine.dispose()
+    print(json.dumps(report.summary(), indent=2))
+
+async def _rescore_limits(args) -> None:
+    from app.services.credit_scoring import rescore_all
+    from app.utils.database import async_engine
+    
+    try:
+        report = await rescore_all(batch_size=args.batch_size)
+    finally:
+        await async_engine.dispose()
+    print(json.dumps(report.summary(), indent=2))
+
+def main(argv=None) -> None:
+    from app.services.credit_scoring import SCORING_BATCH_SIZE
+    from app.services.loan_sweeper import LOAN_SWEEP_CHUNK_SIZE
+    from app.services.reconciliation import (
+        RECONCILE_CONCURRENCY, RECONCILE_OLDER_THAN_MINUTES, RECONCILE_PAGE_SIZE
+    )
+    
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="MicroLoan operational commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    reconcile = commands.add_parser("reconcile", help="Verify stale pending transactions against Paystack")
+    reconcile.add_argument("--older-than", type=float, default=RECONCILE_OLDER_THAN_MINUTES, help="minutes")
+    reconcile.add_argument("--page-size", type=int, default=RECONCILE_PAGE_SIZE)
+    reconcile.add_argument("--concurrency", type=int, default=RECONCILE_CONCURRENCY)
+    reconcile.set_defaults(handler=_reconcile)
+    
+    portfolio = commands.add_parser("portfolio-rebuild", help="Recompute the portfolio summary from the loans table")
+    portfolio.add_argument("--check", action="store_true", help="only report drift, exit 1 if any")
+    portfolio.set_defaults(handler=_portfolio_rebuild)
+    
+    sweep = commands.add_parser("sweep-loans", help="Move loans past their due date to overdue, then defaulted")
+    sweep.add_argument("--chunk-size", type=int, default=LOAN_SWEEP_CHUNK_SIZE)
+    sweep.set_defaults(handler=_sweep_loans)
+    
+    rescore = commands.add_parser("rescore-limits", help="Recompute every borrower's loan limit from repayment history")
+    rescore.add_argument("--batch-size", type=int, default=SCORING_BATCH_SIZE, help="users per batch")
+    rescore.set_defaults(handler=_rescore_limits)
+    
+    args = parser.parse_args(argv)
+    asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,51 @@
 import os
-from fastapi import FastAPI
+import math
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from app.routers import admin, auth, loan, payments
+from app.services.payment_events import broker, start_payment_listener
+from app.services.paystack_service import paystack_service
+from app.services.loan_sweeper import start_sweeper_task
+from app.services.reconciliation import start_reconciliation_task
+from app.services.webhook_inbox import start_webhook_consumer
+from app.utils.auth import shutdown_password_executor
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.database import async_engine, pool_status, read_async_engine
+from app.utils.metrics import (
+    METRICS_ENABLED, MetricsMiddleware, instrument_engine, register_gauges, render_metrics
+)
+from app.utils.read_replica import LAST_WRITE_HEADER, ReadYourWritesMiddleware, replica, start_replica_monitor
+from app.utils.responses import PydanticJSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await paystack_service.start()
+    background_tasks = [
+        task for task in (
+            start_webhook_consumer(), start_reconciliation_task(), start_sweeper_task(), start_replica_monitor(),
+            start_payment_listener()
+        ) if task is not None
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await paystack_service.close()
+    shutdown_password_executor()
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
+
+app = FastAPI(
     title="MicroLoan API",
     description="A microloan web application API with Paystack M-Pesa integration",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=PydanticJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -14,11 +54,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", LAST_WRITE_HEADER],
 )
 
+if read_async_engine is not None:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(async_engine.sync_engine)
+    register_gauges("db_pool", "Database connection pool state for this worker", lambda: pool_status(async_engine))
+    register_gauges("paystack_breaker", "Paystack circuit breaker state (state: 0 closed, 1 half-open, 2 open)", lambda: {
+        **paystack_service.breaker.stats(),
+        "state": ("closed", "half_open", "open").index(paystack_service.breaker.state)
+    })
+    register_gauges("payment_status", "Payment status waiters and notifications in this worker", broker.stats)
+    if read_async_engine is not None:
+        instrument_engine(read_async_engine.sync_engine)
+        register_gauges("db_replica_pool", "Read replica connection pool state for this worker", lambda: pool_status(read_async_engine))
+        register_gauges("db_replica", "Read replica health and read routing for this worker (healthy: 0 or 1)", lambda: {
+            **replica.stats(), "healthy": int(replica.healthy)
+        })
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    # Fail fast instead of queueing behind a provider that is down
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Payment provider is temporarily unavailable. Please try again shortly."},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
 app.include_router(auth.router)
 app.include_router(loan.router)
 app.include_router(payments.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
@@ -27,3 +97,19 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/health/paystack")
+async def paystack_health():
+    return paystack_service.stats()
+
+@app.get("/health/db")
+async def database_health():
+    health = pool_status(async_engine)
+    if read_async_engine is not None:
+        health["replica"] = {**replica.stats(), "pool": pool_status(read_async_engine)}
+    return health
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,25 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index, text
 from sqlalchemy.sql import func
 from app.utils.database import Base
 
 class Loan(Base):
     __tablename__ = "loans"
+    __table_args__ = (
+        Index("ix_loans_user_id_status", "user_id", "status"),
+        Index("ix_loans_user_id_created_at", "user_id", "created_at"),
+        # At most one unrepaid loan per user; overdue and defaulted loans still count
+        Index(
+            "uq_loans_one_active_per_user", "user_id", unique=True,
+            postgresql_where=text("status IN ('pending', 'approved', 'disbursed', 'overdue', 'defaulted')"),
+            sqlite_where=text("status IN ('pending', 'approved', 'disbursed', 'overdue', 'defaulted')")
+        ),
+        # Keyset walk for the overdue sweeper; repaid loans are left out
+        Index(
+            "ix_loans_open_status_id", "status", "id",
+            postgresql_where=text("status IN ('approved', 'disbursed', 'overdue')"),
+            sqlite_where=text("status IN ('approved', 'disbursed', 'overdue')")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -12,6 +28,6 @@ class Loan(Base):
     total = Column(Integer, nullable=False)
     duration = Column(Integer, default=30)
     interest_rate = Column(Float, default=0.03)
-    status = Column(String(20), default="pending")
+    status = Column(String(20), default="pending")  # pending, approved, disbursed, overdue, defaulted, repaid
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
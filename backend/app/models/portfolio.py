@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Date, DateTime
+from sqlalchemy.sql import func
+from app.utils.database import Base
+
+class PortfolioDaily(Base):
+    """
+    Loan book totals per origination day (UTC) and current loan status,
+    split across buckets that writers pick at random; readers sum them
+    """
+    __tablename__ = "portfolio_daily"
+    
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    bucket = Column(SmallInteger, primary_key=True, default=0, autoincrement=False)
+    loan_count = Column(Integer, nullable=False, default=0)
+    principal = Column(BigInteger, nullable=False, default=0)
+    fees = Column(BigInteger, nullable=False, default=0)
+    total = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,9 +1,21 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.utils.database import Base
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_loan_id_created_at", "loan_id", "created_at"),
+        # Newest-first admin search
+        Index("ix_transactions_created_at_id", "created_at", "id"),
+        # Serves metadata containment (@>) searches
+        Index(
+            "ix_transactions_metadata", "transaction_metadata",
+            postgresql_using="gin",
+            postgresql_ops={"transaction_metadata": "jsonb_path_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     loan_id = Column(Integer, ForeignKey("loans.id"), nullable=False)
@@ -11,6 +23,6 @@ class Transaction(Base):
     type = Column(String(20), default="payment")  # payment, refund, etc.
     reference = Column(String(100), unique=True, nullable=False)
     status = Column(String(20), default="pending")  # pending, success, failed
-    transaction_metadata = Column(JSON, nullable=True)
+    transaction_metadata = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # loan_id, user_phone, payment_method
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
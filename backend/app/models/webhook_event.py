@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, UniqueConstraint, text
+from sqlalchemy.sql import func
+from app.utils.database import Base
+
+class WebhookEvent(Base):
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        # Paystack retries deliver the same event/reference pair; keep only the first
+        UniqueConstraint("event", "reference", name="uq_webhook_events_event_reference"),
+        Index(
+            "ix_webhook_events_pending", "id",
+            postgresql_where=text("processed_at IS NULL"),
+            sqlite_where=text("processed_at IS NULL")
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event = Column(String(50), nullable=False)
+    reference = Column(String(100), nullable=True)
+    payload = Column(Text, nullable=False)  # raw request body as received
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from enum import Enum
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.auth import require_admin
+from app.utils.database import AsyncSessionLocal
+from app.utils.read_replica import get_read_db
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, next_cursor
+from app.models.loan import Loan
+from app.models.portfolio import PortfolioDaily
+from app.models.transaction import Transaction
+from app.schemas.admin import AdminTransaction, AdminTransactionListResponse, PortfolioResponse
+from app.services.portfolio import summarize, summed_portfolio
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+EXPORT_BATCH_SIZE = 2000
+
+class ExportTable(str, Enum):
+    transactions = "transactions"
+    loans = "loans"
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+EXPORT_MODELS = {
+    ExportTable.transactions: Transaction,
+    ExportTable.loans: Loan,
+}
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+def _created_between(query, model, start: Optional[date], end: Optional[date]):
+    if start:
+        query = query.where(model.created_at >= datetime.combine(start, time.min, tzinfo=timezone.utc))
+    if end:
+        # end date is inclusive
+        query = query.where(model.created_at < datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc))
+    return query
+
+def _metadata_contains(db: AsyncSession, criteria: dict):
+    """Transactions whose metadata holds every key/value in criteria"""
+    if db.bind.dialect.name == "postgresql":
+        # @> is served by the ix_transactions_metadata GIN index
+        return type_coerce(Transaction.transaction_metadata, JSONB).contains(criteria)
+    return and_(*(Transaction.transaction_metadata[key].as_string() == value for key, value in criteria.items()))
+
+async def _export_rows(query, columns: list[str], export_format: ExportFormat):
+    """Stream rows from a server-side cursor, encoding one batch at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == ExportFormat.csv:
+        writer.writerow(columns)
+    
+    # A dedicated session: the request-scoped one may be closed before streaming finishes
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            if export_format == ExportFormat.csv:
+                writer.writerows([_csv_value(value) for value in row] for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, map(_json_value, row)))))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/export/{table}")
+async def export_table(
+    table: ExportTable,
+    format: ExportFormat = ExportFormat.ndjson,
+    status: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
+    model = EXPORT_MODELS[table]
+    columns = [column.key for column in model.__table__.columns]
+    query = select(*[getattr(model, name) for name in columns]).order_by(model.id)
+    if status:
+        query = query.where(model.status == status)
+    query = _created_between(query, model, start, end)
+    
+    media_type = "application/x-ndjson" if format == ExportFormat.ndjson else "text/csv"
+    filename = f"{table.value}.{'ndjson' if format == ExportFormat.ndjson else 'csv'}"
+    return StreamingResponse(
+        _export_rows(query, columns, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/transactions", response_model=AdminTransactionListResponse)
+async def search_transactions(
+    phone: Optional[str] = None,
+    channel: Optional[str] = None,
+    status: Optional[str] = None,
+    loan_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Transactions matching every given filter, newest first; phone and channel are matched in the metadata"""
+    query = select(Transaction)
+    criteria = {key: value for key, value in (("user_phone", phone), ("payment_method", channel)) if value}
+    if criteria:
+        query = query.where(_metadata_contains(db, criteria))
+    if status:
+        query = query.where(Transaction.status == status)
+    if loan_id is not None:
+        query = query.where(Transaction.loan_id == loan_id)
+    query = _created_between(query, Transaction, start, end)
+    
+    rows = list((await db.scalars(keyset_page(query, Transaction.created_at, Transaction.id, cursor, limit))).all())
+    cursor = next_cursor(rows, limit)
+    return AdminTransactionListResponse(
+        transactions=[AdminTransaction.model_validate(row) for row in rows],
+        next_cursor=cursor
+    )
+
+@router.get("/portfolio", response_model=PortfolioResponse)
+async def get_portfolio(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Loan book totals read from the incrementally maintained summary table"""
+    query = summed_portfolio().order_by(PortfolioDaily.day, PortfolioDaily.status)
+    if start:
+        query = query.where(PortfolioDaily.day >= start)
+    if end:
+        query = query.where(PortfolioDaily.day <= end)
+    rows = [row for row in (await db.execute(query)).all() if row.loan_count]
+    
+    return PortfolioResponse(days=rows, **summarize(rows))
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.utils.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.database import get_async_db
+from app.utils.etag import check_etag, weak_etag
+from app.utils.responses import model_response
 from app.utils.auth import (
-    get_password_hash, verify_password, create_access_token, 
-    create_refresh_token, decode_token, get_current_user
+    hash_password, verify_and_update_password, create_access_token, 
+    create_refresh_token, decode_token, get_current_user_read
 )
 from app.models.user import User
 from app.schemas.user import (
@@ -14,22 +17,22 @@ from app.schemas.user import (
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=TokenResponse)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.phone == user_data.phone).first()
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await db.scalar(select(User).where(User.phone == user_data.phone))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Phone number already registered"
         )
     
-    existing_id = db.query(User).filter(User.id_number == user_data.id_number).first()
+    existing_id = await db.scalar(select(User).where(User.id_number == user_data.id_number))
     if existing_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="ID number already registered"
         )
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     new_user = User(
         phone=user_data.phone,
         id_number=user_data.id_number,
@@ -37,8 +40,8 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         loan_limit=5000
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     access_token = create_access_token(data={"sub": new_user.phone})
     refresh_token = create_refresh_token(data={"sub": new_user.phone})
@@ -50,14 +53,25 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=TokenResponse)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.phone == user_data.phone).first()
-    if not user or not verify_password(user_data.password, user.password_hash):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.phone == user_data.phone))
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid phone number or password"
         )
     
+    valid, new_hash = await verify_and_update_password(user_data.password, user.password_hash)
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid phone number or password"
+        )
+    
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+    
     access_token = create_access_token(data={"sub": user.phone})
     refresh_token = create_refresh_token(data={"sub": user.phone})
     
@@ -68,7 +82,7 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     )
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db)):
+async def refresh_token(token_data: TokenRefresh, db: AsyncSession = Depends(get_async_db)):
     payload = decode_token(token_data.refresh_token)
     if payload.get("type") != "refresh":
         raise HTTPException(
@@ -77,7 +91,7 @@ async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db))
         )
     
     phone = payload.get("sub")
-    user = db.query(User).filter(User.phone == phone).first()
+    user = await db.scalar(select(User).where(User.phone == phone))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -93,12 +107,16 @@ async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db))
     )
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def get_me(request: Request, response: Response, current_user: User = Depends(get_current_user_read)):
+    etag = weak_etag("user", current_user.id, current_user.updated_at, current_user.loan_limit)
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    return model_response(UserResponse.model_validate(current_user), response)
 
 @router.post("/otp/request", response_model=MessageResponse)
-async def request_otp(phone: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.phone == phone).first()
+async def request_otp(phone: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.phone == phone))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -107,8 +125,8 @@ async def request_otp(phone: str, db: Session = Depends(get_db)):
     return MessageResponse(message="OTP sent successfully")
 
 @router.post("/otp/verify", response_model=TokenResponse)
-async def verify_otp(phone: str, otp: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.phone == phone).first()
+async def verify_otp(phone: str, otp: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.phone == phone))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,11 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.utils.database import get_db
-from app.utils.auth import get_current_user
+import hashlib
+import json
+from bisect import bisect_right
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.database import get_async_db
+from app.utils.read_replica import get_read_db
+from app.utils.auth import get_current_user, get_current_user_read
+from app.utils.etag import check_etag, etag_matches, weak_etag
+from app.utils.responses import model_response
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, next_cursor, split_versioned, versioned_page
+)
 from app.models.user import User
 from app.models.loan import Loan
+from app.services.portfolio import PortfolioDelta
 from app.schemas.loan import (
-    LoanPreviewRequest, LoanPreviewResponse, LoanApplyRequest,
+    MAX_BATCH_QUOTES, LoanPreviewRequest, LoanPreviewResponse, LoanBatchPreviewRequest,
+    LoanBatchPreviewResponse, FeeScheduleResponse, LoanApplyRequest,
     LoanResponse, LoanListResponse
 )
 
@@ -25,25 +39,38 @@ FEE_STRUCTURE = {
     60000: 6000
 }
 
+# Fee schedule compiled once: each tier's fee applies from its principal up to the next tier
+FEE_TIERS = sorted(FEE_STRUCTURE)
+FEE_VALUES = [FEE_STRUCTURE[amount] for amount in FEE_TIERS]
+MIN_PRINCIPAL = FEE_TIERS[0]
+MAX_PRINCIPAL = FEE_TIERS[-1]
+
+# Listing endpoints select plain columns instead of full ORM entities
+LOAN_RESPONSE_COLUMNS = [getattr(Loan, name) for name in LoanResponse.model_fields]
+
+FEE_SCHEDULE = FeeScheduleResponse(
+    min_principal=MIN_PRINCIPAL,
+    max_principal=MAX_PRINCIPAL,
+    tiers=[{"min_principal": amount, "fee": fee} for amount, fee in zip(FEE_TIERS, FEE_VALUES)]
+)
+FEE_SCHEDULE_ETAG = '"%s"' % hashlib.sha256(
+    json.dumps(FEE_SCHEDULE.model_dump(), sort_keys=True).encode()
+).hexdigest()[:16]
+
 def calculate_fee(principal: int) -> int:
-    if principal < 3000 or principal > 60000:
+    if principal < MIN_PRINCIPAL or principal > MAX_PRINCIPAL:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Loan amount must be between 3,000 and 60,000"
         )
-    
-    if principal in FEE_STRUCTURE:
-        return FEE_STRUCTURE[principal]
-    
-    if 6000 <= principal <= 8000:
-        return 460
-    
-    sorted_amounts = sorted(FEE_STRUCTURE.keys())
-    for i, amount in enumerate(sorted_amounts):
-        if principal < amount:
-            return FEE_STRUCTURE[sorted_amounts[i-1]] if i > 0 else FEE_STRUCTURE[sorted_amounts[0]]
-    
-    return FEE_STRUCTURE[60000]
+    return FEE_VALUES[bisect_right(FEE_TIERS, principal) - 1]
+
+def quote_loans(principals: list[int]) -> list[LoanPreviewResponse]:
+    """Quote many principals at once against the compiled fee schedule"""
+    return [
+        LoanPreviewResponse(principal=principal, fee=fee, total_repayable=principal + fee)
+        for principal, fee in zip(principals, map(calculate_fee, principals))
+    ]
 
 @router.post("/preview", response_model=LoanPreviewResponse)
 async def loan_preview(request: LoanPreviewRequest):
@@ -54,11 +81,39 @@ async def loan_preview(request: LoanPreviewRequest):
         total_repayable=request.principal + fee
     )
 
+@router.post("/preview/batch", response_model=LoanBatchPreviewResponse)
+async def loan_preview_batch(request: LoanBatchPreviewRequest):
+    if request.principals is not None:
+        principals = request.principals
+    elif request.start is not None and request.stop is not None and request.step > 0:
+        principals = range(request.start, request.stop + 1, request.step)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either principals or start, stop and a positive step"
+        )
+    
+    if len(principals) > MAX_BATCH_QUOTES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_QUOTES} principals can be quoted at once"
+        )
+    
+    return model_response(LoanBatchPreviewResponse(quotes=quote_loans(list(principals))))
+
+@router.get("/fee-schedule", response_model=FeeScheduleResponse)
+async def fee_schedule(request: Request, response: Response):
+    headers = {"ETag": FEE_SCHEDULE_ETAG, "Cache-Control": "public, max-age=3600"}
+    if etag_matches(request, FEE_SCHEDULE_ETAG):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return model_response(FEE_SCHEDULE, response)
+
 @router.post("/apply", response_model=LoanResponse)
 async def apply_loan(
     request: LoanApplyRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if request.amount > current_user.loan_limit:
         raise HTTPException(
@@ -66,17 +121,6 @@ async def apply_loan(
             detail=f"Amount exceeds your loan limit of {current_user.loan_limit}"
         )
     
-    active_loan = db.query(Loan).filter(
-        Loan.user_id == current_user.id,
-        Loan.status.in_(["pending", "approved", "disbursed"])
-    ).first()
-    
-    if active_loan:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You have an active loan. Please repay it first."
-        )
-    
     fee = calculate_fee(request.amount)
     total = request.amount + fee
     
@@ -88,29 +132,80 @@ async def apply_loan(
         status="approved"
     )
     db.add(new_loan)
-    db.commit()
-    db.refresh(new_loan)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # uq_loans_one_active_per_user rejects a second active loan
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You have an active loan. Please repay it first."
+        )
+    await db.refresh(new_loan)
+    
+    delta = PortfolioDelta()
+    delta.add(new_loan.created_at, new_loan.status, new_loan.amount, new_loan.fee, new_loan.total)
+    await delta.apply(db)
+    await db.commit()
     
     return new_loan
 
 @router.get("/history", response_model=LoanListResponse)
 async def get_loan_history(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    loans = db.query(Loan).filter(Loan.user_id == current_user.id).order_by(Loan.created_at.desc()).all()
-    return LoanListResponse(loans=loans, loan_limit=current_user.loan_limit)
+    # Any insert, update or delete of the user's loans changes this probe
+    version_query = select(
+        func.count(Loan.id).label("version_count"),
+        func.max(Loan.id).label("version_max_id"),
+        func.max(func.coalesce(Loan.updated_at, Loan.created_at)).label("version_changed_at")
+    ).where(Loan.user_id == current_user.id)
+    query = select(*LOAN_RESPONSE_COLUMNS).where(Loan.user_id == current_user.id)
+    if request.headers.get("if-none-match"):
+        # A revalidation usually matches, and then the probe alone answers it
+        version, rows = tuple((await db.execute(version_query)).one()), None
+    else:
+        version, rows = split_versioned((await db.execute(
+            versioned_page(version_query, query, Loan.created_at, Loan.id, cursor, limit)
+        )).all(), 3)
+    etag = weak_etag("loans", current_user.id, current_user.loan_limit, cursor, limit, *version)
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    if rows is None:
+        rows = list((await db.execute(keyset_page(query, Loan.created_at, Loan.id, cursor, limit))).all())
+    cursor = next_cursor(rows, limit)
+    return model_response(LoanListResponse(
+        loans=[LoanResponse.model_validate(row, from_attributes=True) for row in rows],
+        loan_limit=current_user.loan_limit,
+        next_cursor=cursor
+    ), response)
 
 @router.get("/{loan_id}", response_model=LoanResponse)
 async def get_loan(
     loan_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    loan = db.query(Loan).filter(Loan.id == loan_id, Loan.user_id == current_user.id).first()
+    # The row is small enough that its fetch doubles as the version probe
+    loan = (await db.execute(
+        select(*LOAN_RESPONSE_COLUMNS, Loan.updated_at)
+        .where(Loan.id == loan_id, Loan.user_id == current_user.id)
+    )).one_or_none()
     if not loan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Loan not found"
         )
-    return loan
+    not_modified = check_etag(request, response, weak_etag("loan", loan.id, loan.status, loan.updated_at))
+    if not_modified:
+        return not_modified
+    return model_response(LoanResponse.model_validate(loan, from_attributes=True), response)
@@ -1,30 +1,50 @@
 import uuid
 import json
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Header
-from sqlalchemy.orm import Session
-from app.utils.database import get_db
-from app.utils.auth import get_current_user
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.database import get_async_db
+from app.utils.read_replica import get_read_db
+from app.utils.auth import get_current_user, get_current_user_read, invalidate_user_cache
+from app.utils.etag import check_etag, weak_etag
+from app.utils.responses import model_response
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, next_cursor, split_versioned, versioned_page
+)
 from app.models.user import User
 from app.models.loan import Loan
 from app.models.transaction import Transaction
 from app.schemas.payment import (
-    PaymentInitRequest, PaymentInitResponse, PaymentVerifyResponse,
-    WebhookPayload, TransactionResponse
+    PaymentInitRequest, PaymentInitResponse, PaymentVerifyResponse, PaymentStatusResponse,
+    WebhookPayload, TransactionResponse, TransactionListResponse
+)
+from app.services.payment_events import (
+    PAYMENT_STATUS_KEEPALIVE_SECONDS, PAYMENT_STATUS_STREAM_SECONDS, PAYMENT_STATUS_WAIT_SECONDS,
+    Subscription, broker
 )
 from app.services.paystack_service import paystack_service
+from app.services.settlement import FINAL_FAILURE_STATUSES, fail_references, settle_references
+from app.services.webhook_inbox import enqueue_event
 
 router = APIRouter(prefix="/api/payments", tags=["Payments"])
 
+TRANSACTION_RESPONSE_COLUMNS = [getattr(Transaction, name) for name in TransactionResponse.model_fields]
+
 @router.post("/initialize", response_model=PaymentInitResponse)
 async def initialize_payment(
     request: PaymentInitRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    loan = db.query(Loan).filter(
-        Loan.id == request.loan_id,
-        Loan.user_id == current_user.id
-    ).first()
+    loan = await db.scalar(
+        select(Loan).where(
+            Loan.id == request.loan_id,
+            Loan.user_id == current_user.id
+        )
+    )
     
     if not loan:
         raise HTTPException(
@@ -61,14 +81,14 @@ async def initialize_payment(
         reference=reference,
         amount=loan.total,
         status="pending",
-        transaction_metadata=json.dumps({
+        transaction_metadata={
             "loan_id": loan.id,
             "user_phone": current_user.phone,
             "payment_method": "mpesa"
-        })
+        }
     )
     db.add(new_transaction)
-    db.commit()
+    await db.commit()
     
     return PaymentInitResponse(
         authorization_url=result["authorization_url"],
@@ -80,92 +100,235 @@ async def initialize_payment(
 async def verify_payment(
     reference: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    transaction = db.query(Transaction).filter(Transaction.reference == reference).first()
-    if not transaction:
+    row = (await db.execute(
+        select(Transaction.status, Transaction.amount, Loan.user_id)
+        .join(Loan, Loan.id == Transaction.loan_id)
+        .where(Transaction.reference == reference)
+    )).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Transaction not found"
         )
     
-    loan = db.query(Loan).filter(Loan.id == transaction.loan_id).first()
-    if not loan or loan.user_id != current_user.id:
+    if row.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to verify this transaction"
         )
     
+    # Already settled (e.g. by the webhook); no need to ask Paystack again
+    if row.status == "success":
+        return PaymentVerifyResponse(
+            status="success",
+            reference=reference,
+            amount=row.amount,
+            message="Payment successful. Loan marked as repaid."
+        )
+    
+    # Release the read transaction while waiting on Paystack
+    await db.rollback()
     result = await paystack_service.verify_transaction(reference)
     
     if result.get("success"):
-        transaction.status = "success"
-        loan.status = "repaid"
-        
-        user = db.query(User).filter(User.id == current_user.id).first()
-        if user.loan_limit < 60000:
-            user.loan_limit = min(user.loan_limit + 2000, 60000)
-        
-        db.commit()
+        settlement = await settle_references(db, [reference])
+        await db.commit()
+        for phone in settlement.phones:
+            invalidate_user_cache(phone)
         
+        # Not moved by this call: report success only if it was settled by someone else
+        if settlement.references or await db.scalar(
+            select(Transaction.status).where(Transaction.reference == reference)
+        ) == "success":
+            return PaymentVerifyResponse(
+                status="success",
+                reference=reference,
+                amount=result["amount"],
+                message="Payment successful. Loan marked as repaid."
+            )
         return PaymentVerifyResponse(
-            status="success",
+            status="pending",
             reference=reference,
-            amount=result["amount"],
-            message="Payment successful. Loan marked as repaid."
+            amount=0,
+            message="Payment confirmed by Paystack and is being applied. Please check again shortly."
         )
-    else:
-        transaction.status = "failed"
-        db.commit()
-        
+    
+    # Only Paystack's own failed or reversed answer is final; errors and timeouts leave it pending
+    if result.get("status") in FINAL_FAILURE_STATUSES:
+        await fail_references(db, [reference])
+        await db.commit()
         return PaymentVerifyResponse(
             status="failed",
             reference=reference,
             amount=0,
             message=result.get("message", "Payment verification failed")
         )
+    return PaymentVerifyResponse(
+        status="pending",
+        reference=reference,
+        amount=0,
+        message=result.get("message", "Payment not confirmed yet")
+    )
+
+async def _payment_status(db: AsyncSession, reference: str, user_id: int) -> PaymentStatusResponse:
+    row = (await db.execute(
+        select(Transaction.status, Transaction.amount, Loan.user_id)
+        .join(Loan, Loan.id == Transaction.loan_id)
+        .where(Transaction.reference == reference)
+    )).first()
+    # Return the connection to the pool; nothing is held while the caller waits
+    await db.rollback()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction not found"
+        )
+    if row.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this transaction"
+        )
+    return PaymentStatusResponse(reference=reference, status=row.status, amount=row.amount)
+
+async def _next_status(
+    subscription: Subscription, current: PaymentStatusResponse, timeout: float
+) -> Optional[PaymentStatusResponse]:
+    """The status once something is published for the reference, or None after timeout"""
+    if not await subscription.wait(timeout):
+        return None
+    return current.model_copy(update={"status": subscription.status})
+
+def _status_event(current: PaymentStatusResponse) -> str:
+    return f"event: status\ndata: {current.model_dump_json()}\n\n"
+
+async def _status_events(subscription: Subscription, current: PaymentStatusResponse):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + PAYMENT_STATUS_STREAM_SECONDS
+    try:
+        yield "retry: 3000\n" + _status_event(current)
+        while current.status == "pending" and loop.time() < deadline:
+            update = await _next_status(
+                subscription, current, min(PAYMENT_STATUS_KEEPALIVE_SECONDS, deadline - loop.time())
+            )
+            if update is None:
+                yield ": keepalive\n\n"
+            elif update.status != current.status:
+                current = update
+                yield _status_event(current)
+    finally:
+        broker.unsubscribe(subscription)
+
+@router.get("/status/{reference}", response_model=PaymentStatusResponse)
+async def payment_status(
+    reference: str,
+    request: Request,
+    wait: float = Query(PAYMENT_STATUS_WAIT_SECONDS, ge=0, le=PAYMENT_STATUS_WAIT_SECONDS),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Status of a payment, pushed when it settles instead of asking Paystack.
+    A pending payment is held open until it changes: as a Server-Sent
+    Events stream if the client accepts text/event-stream, otherwise as a
+    long poll that returns after at most `wait` seconds.
+    """
+    # Read before _payment_status rolls back, which expires current_user
+    user_id = current_user.id
+    # Subscribe before reading so a settlement in between is not missed
+    subscription = broker.subscribe(reference)
+    try:
+        current = await _payment_status(db, reference, user_id)
+    except HTTPException:
+        broker.unsubscribe(subscription)
+        raise
+    
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _status_events(subscription, current),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    try:
+        while current.status == "pending" and loop.time() < deadline:
+            current = await _next_status(subscription, current, deadline - loop.time()) or current
+    finally:
+        broker.unsubscribe(subscription)
+    return current
 
 @router.post("/webhook")
 async def paystack_webhook(
     request: Request,
     x_paystack_signature: str = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     payload = await request.body()
     
-    if x_paystack_signature:
-        if not paystack_service.verify_webhook_signature(payload, x_paystack_signature):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid webhook signature"
-            )
+    # Nothing reaches the inbox unless Paystack signed it
+    if not x_paystack_signature or not paystack_service.verify_webhook_signature(payload, x_paystack_signature):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
+    
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook payload"
+        )
     
-    data = await request.json()
-    event = data.get("event")
-    event_data = data.get("data", {})
-    
-    if event == "charge.success":
-        reference = event_data.get("reference")
-        if reference:
-            transaction = db.query(Transaction).filter(Transaction.reference == reference).first()
-            if transaction:
-                transaction.status = "success"
-                loan = db.query(Loan).filter(Loan.id == transaction.loan_id).first()
-                if loan:
-                    loan.status = "repaid"
-                    user = db.query(User).filter(User.id == loan.user_id).first()
-                    if user and user.loan_limit < 60000:
-                        user.loan_limit = min(user.loan_limit + 2000, 60000)
-                db.commit()
+    # Settlement happens in the background consumer; acknowledge as soon as the event is stored
+    await enqueue_event(db, payload, data)
     
     return {"status": "success"}
 
-@router.get("/transactions", response_model=list[TransactionResponse])
+@router.get("/transactions", response_model=TransactionListResponse)
 async def get_transactions(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    loans = db.query(Loan).filter(Loan.user_id == current_user.id).all()
-    loan_ids = [loan.id for loan in loans]
-    transactions = db.query(Transaction).filter(Transaction.loan_id.in_(loan_ids)).order_by(Transaction.created_at.desc()).all()
-    return transactions
+    version_query = (
+        select(
+            func.count(Transaction.id).label("version_count"),
+            func.max(Transaction.id).label("version_max_id"),
+            func.max(func.coalesce(Transaction.updated_at, Transaction.created_at)).label("version_changed_at")
+        )
+        .join(Loan, Loan.id == Transaction.loan_id)
+        .where(Loan.user_id == current_user.id)
+    )
+    query = (
+        select(*TRANSACTION_RESPONSE_COLUMNS)
+        .join(Loan, Loan.id == Transaction.loan_id)
+        .where(Loan.user_id == current_user.id)
+    )
+    if request.headers.get("if-none-match"):
+        # A revalidation usually matches, and then the probe alone answers it
+        version, rows = tuple((await db.execute(version_query)).one()), None
+    else:
+        version, rows = split_versioned((await db.execute(
+            versioned_page(version_query, query, Transaction.created_at, Transaction.id, cursor, limit)
+        )).all(), 3)
+    etag = weak_etag("transactions", current_user.id, cursor, limit, *version)
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    if rows is None:
+        rows = list((await db.execute(
+            keyset_page(query, Transaction.created_at, Transaction.id, cursor, limit)
+        )).all())
+    cursor = next_cursor(rows, limit)
+    return model_response(TransactionListResponse(
+        transactions=[TransactionResponse.model_validate(row, from_attributes=True) for row in rows],
+        next_cursor=cursor
+    ), response)
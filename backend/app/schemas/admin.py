@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Optional
+
+class PortfolioDay(BaseModel):
+    day: date
+    status: str
+    loan_count: int
+    principal: int
+    fees: int
+    total: int
+    
+    class Config:
+        from_attributes = True
+
+class PortfolioResponse(BaseModel):
+    loan_count: int
+    outstanding_principal: int
+    outstanding_total: int
+    fees_earned: int
+    repaid_count: int
+    days: list[PortfolioDay]
+
+class AdminTransaction(BaseModel):
+    id: int
+    loan_id: int
+    reference: str
+    amount: int
+    type: Optional[str] = None
+    status: str
+    transaction_metadata: Optional[dict] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class AdminTransactionListResponse(BaseModel):
+    transactions: list[AdminTransaction]
+    next_cursor: Optional[str] = None
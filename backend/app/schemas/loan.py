@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
@@ -10,6 +10,26 @@ class LoanPreviewResponse(BaseModel):
     fee: int
     total_repayable: int
 
+MAX_BATCH_QUOTES = 1000
+
+class LoanBatchPreviewRequest(BaseModel):
+    principals: Optional[list[int]] = Field(None, max_length=MAX_BATCH_QUOTES)
+    start: Optional[int] = None
+    stop: Optional[int] = None
+    step: int = 1000
+
+class LoanBatchPreviewResponse(BaseModel):
+    quotes: list[LoanPreviewResponse]
+
+class FeeTier(BaseModel):
+    min_principal: int
+    fee: int
+
+class FeeScheduleResponse(BaseModel):
+    min_principal: int
+    max_principal: int
+    tiers: list[FeeTier]
+
 class LoanApplyRequest(BaseModel):
     amount: int
 
@@ -28,3 +48,4 @@ class LoanResponse(BaseModel):
 class LoanListResponse(BaseModel):
     loans: list[LoanResponse]
     loan_limit: int
+    next_cursor: Optional[str] = None
@@ -17,6 +17,11 @@ class PaymentVerifyResponse(BaseModel):
     amount: int
     message: str
 
+class PaymentStatusResponse(BaseModel):
+    reference: str
+    status: str
+    amount: int
+
 class WebhookPayload(BaseModel):
     event: str
     data: dict
@@ -31,3 +36,7 @@ class TransactionResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class TransactionListResponse(BaseModel):
+    transactions: list[TransactionResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,155 @@
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import GenericFunction
+from sqlalchemy.types import DateTime
+from app.models.loan import Loan
+from app.services.portfolio import PortfolioDelta
+from app.utils.database import AsyncSessionLocal
+from app.utils.metrics import LOAN_TRANSITIONS
+
+logger = logging.getLogger("loan_sweeper")
+
+LOAN_SWEEP_INTERVAL_MINUTES = float(os.getenv("LOAN_SWEEP_INTERVAL_MINUTES", "0"))  # 0 disables the in-process task
+LOAN_SWEEP_CHUNK_SIZE = int(os.getenv("LOAN_SWEEP_CHUNK_SIZE", "5000"))
+LOAN_DEFAULT_AFTER_DAYS = int(os.getenv("LOAN_DEFAULT_AFTER_DAYS", "30"))  # days past due before a loan defaults
+DEFAULT_LOAN_DURATION = 30
+
+# (from, to, days after created_at + duration)
+TRANSITIONS = [
+    ("approved", "overdue", 0),
+    ("disbursed", "overdue", 0),
+    ("overdue", "defaulted", LOAN_DEFAULT_AFTER_DAYS),
+]
+
+class add_days(GenericFunction):
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+@compiles(add_days, "postgresql")
+def _add_days_postgresql(element, compiler, **kw):
+    timestamp, days = list(element.clauses)
+    return "(%s + make_interval(days => %s))" % (compiler.process(timestamp, **kw), compiler.process(days, **kw))
+
+@compiles(add_days, "sqlite")
+def _add_days_sqlite(element, compiler, **kw):
+    timestamp, days = list(element.clauses)
+    return "datetime(%s, '+' || (%s) || ' days')" % (compiler.process(timestamp, **kw), compiler.process(days, **kw))
+
+@dataclass
+class SweepReport:
+    overdue: int = 0
+    defaulted: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    chunk_times: list = field(default_factory=list)
+
+    def summary(self) -> dict:
+        return {
+            "overdue": self.overdue,
+            "defaulted": self.defaulted,
+            "chunks": self.chunks,
+            "elapsed_s": round(self.elapsed, 3),
+            "max_chunk_ms": round(max(self.chunk_times, default=0.0) * 1000, 1)
+        }
+
+async def _sweep_chunk(from_status: str, to_status: str, extra_days: int, last_id: int, chunk_size: int) -> tuple[int, int]:
+    """
+    Move one chunk of loans, in id order after last_id, in its own short
+    transaction. Returns the number moved and the highest id moved.
+    """
+    loans = Loan.__table__
+    due_at = add_days(loans.c.created_at, func.coalesce(loans.c.duration, DEFAULT_LOAN_DURATION) + extra_days)
+    # Rows being settled right now are skipped and picked up by the next run
+    batch = (
+        select(loans.c.id)
+        .where(loans.c.status == from_status, loans.c.id > last_id, due_at < func.now())
+        .order_by(loans.c.id)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+        .cte("batch")
+    )
+    moved = (
+        update(loans)
+        .where(
+            loans.c.id.in_(select(batch.c.id)),
+            # Bounding the id range keeps the update on the primary key; the IN alone lets the planner scan the table
+            loans.c.id > last_id,
+            loans.c.id <= select(func.max(batch.c.id)).scalar_subquery()
+        )
+        .values(status=to_status)
+        .returning(loans.c.id, loans.c.created_at, loans.c.amount, loans.c.fee, loans.c.total)
+    )
+    delta = PortfolioDelta()
+    async with AsyncSessionLocal() as db:
+        if db.bind.dialect.name == "postgresql":
+            # Group the moved rows in the same statement so only one row per origination day comes back
+            moved = moved.cte("moved")
+            day = func.date(func.timezone("UTC", moved.c.created_at))
+            days = (await db.execute(
+                select(
+                    day, func.count(), func.sum(moved.c.amount), func.sum(moved.c.fee),
+                    func.sum(moved.c.total), func.max(moved.c.id)
+                ).group_by(day)
+            )).all()
+            for loan_day, count, amount, fee, total, _ in days:
+                delta.add_day(loan_day, from_status, -count, -amount, -fee, -total)
+                delta.add_day(loan_day, to_status, count, amount, fee, total)
+            moved_count = sum(row[1] for row in days)
+            max_id = max((row[5] for row in days), default=last_id)
+        else:
+            # SQLite has no data-modifying CTEs
+            rows = (await db.execute(moved)).all()
+            for row in rows:
+                delta.move(row.created_at, from_status, to_status, row.amount, row.fee, row.total)
+            moved_count = len(rows)
+            max_id = max((row.id for row in rows), default=last_id)
+        await delta.apply(db)
+        await db.commit()
+    return moved_count, max_id
+
+async def sweep_loans(chunk_size: int = LOAN_SWEEP_CHUNK_SIZE) -> SweepReport:
+    """
+    Move loans past created_at + duration to overdue, and overdue loans
+    LOAN_DEFAULT_AFTER_DAYS later to defaulted, with chunked set-based
+    updates that walk ix_loans_open_status_id. Locks are held for one chunk only.
+    """
+    report = SweepReport()
+    start = time.perf_counter()
+
+    for from_status, to_status, extra_days in TRANSITIONS:
+        last_id = 0
+        while True:
+            chunk_start = time.perf_counter()
+            moved, last_id = await _sweep_chunk(from_status, to_status, extra_days, last_id, chunk_size)
+            report.chunk_times.append(time.perf_counter() - chunk_start)
+            report.chunks += 1
+            if moved:
+                setattr(report, to_status, getattr(report, to_status) + moved)
+                LOAN_TRANSITIONS.inc((from_status, to_status), moved)
+            if moved < chunk_size:
+                break
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+async def run_sweeper_loop(interval_minutes: float = LOAN_SWEEP_INTERVAL_MINUTES) -> None:
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        try:
+            report = await sweep_loans()
+            logger.info("Loan sweep finished: %s", report.summary())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Loan sweep failed")
+
+def start_sweeper_task() -> Optional[asyncio.Task]:
+    if LOAN_SWEEP_INTERVAL_MINUTES <= 0:
+        return None
+    return asyncio.create_task(run_sweeper_loop())
@@ -0,0 +1,204 @@
+import os
+import random
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy import event, func, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.models.transaction import Transaction
+from app.utils.database import (
+    ASYNC_DATABASE_URL, DB_PGBOUNCER, AsyncSessionLocal, PrimarySession, _async_database_url, async_engine
+)
+
+logger = logging.getLogger("payment_events")
+
+# postgres: settlements NOTIFY every worker; memory: only waiters in the settling worker hear them
+PAYMENT_EVENTS_BACKEND = os.getenv(
+    "PAYMENT_EVENTS_BACKEND", "postgres" if async_engine.dialect.name == "postgresql" else "memory"
+)
+# LISTEN needs a session-level connection, which PgBouncer in transaction mode cannot provide
+PAYMENT_EVENTS_DATABASE_URL = os.getenv("PAYMENT_EVENTS_DATABASE_URL")
+PAYMENT_EVENTS_CHANNEL = "payment_status"
+# Longest a status request is held open: long poll, and a stream before the client reconnects
+PAYMENT_STATUS_WAIT_SECONDS = float(os.getenv("PAYMENT_STATUS_WAIT_SECONDS", "25"))
+PAYMENT_STATUS_STREAM_SECONDS = float(os.getenv("PAYMENT_STATUS_STREAM_SECONDS", "300"))
+PAYMENT_STATUS_KEEPALIVE_SECONDS = 15  # comment lines that keep proxies from closing an idle stream
+LISTENER_RETRY_SECONDS = 5
+LISTENER_PING_SECONDS = 60  # a dropped connection is not always noticed while idle
+REFRESH_BATCH_SIZE = 1000  # subscribed references re-read per query after a reconnect
+
+_NOTIFY_SQL = text(
+    "SELECT pg_notify(:channel, :status || ' ' || reference) FROM unnest(CAST(:references AS text[])) AS reference"
+)
+
+class Subscription:
+    """One waiter's interest in a reference; status is set when it is published"""
+
+    __slots__ = ("reference", "status", "_event")
+
+    def __init__(self, reference: str):
+        self.reference = reference
+        self.status: Optional[str] = None
+        self._event = asyncio.Event()
+
+    def notify(self, status: str) -> None:
+        self.status = status
+        self._event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Whether a status arrived within timeout"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+class PaymentStatusBroker:
+    """
+    In-process pub/sub of payment status changes, keyed by reference. A
+    waiter costs one Subscription and no task or database connection, so a
+    worker can hold thousands of idle status requests.
+    """
+
+    def __init__(self):
+        self._subscriptions: dict[str, set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.listening = False
+
+    def subscribe(self, reference: str) -> Subscription:
+        subscription = Subscription(reference)
+        self._subscriptions[reference].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.reference)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.reference]
+
+    def deliver(self, reference: str, status: str) -> None:
+        self.published += 1
+        for subscription in self._subscriptions.get(reference, ()):
+            subscription.notify(status)
+            self.delivered += 1
+
+    async def refresh(self) -> None:
+        """
+        Deliver the status of every subscribed payment that is no longer
+        pending, read in batches of REFRESH_BATCH_SIZE references over one
+        connection, e.g. after the listener reconnects and notifications
+        may have been missed. On failure the waiters keep waiting for their
+        timeout, after which clients ask again.
+        """
+        references = list(self._subscriptions)
+        try:
+            async with AsyncSessionLocal() as db:
+                for start in range(0, len(references), REFRESH_BATCH_SIZE):
+                    rows = (await db.execute(
+                        select(Transaction.reference, Transaction.status).where(
+                            Transaction.reference.in_(references[start:start + REFRESH_BATCH_SIZE]),
+                            Transaction.status != "pending"
+                        )
+                    )).all()
+                    for reference, status in rows:
+                        self.deliver(reference, status)
+        except Exception:
+            logger.exception("Could not re-read the status of %d awaited payments", len(references))
+
+    def stats(self) -> dict:
+        return {
+            "backend": PAYMENT_EVENTS_BACKEND,
+            "listening": int(self.listening),
+            "waiters": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+            "references": len(self._subscriptions),
+            "published": self.published,
+            "delivered": self.delivered
+        }
+
+broker = PaymentStatusBroker()
+
+async def publish_statuses(db: AsyncSession, references: list[str], status: str) -> None:
+    """
+    Announce new payment statuses once the caller's transaction commits;
+    nothing is sent if it rolls back.
+    """
+    if not references:
+        return
+    if PAYMENT_EVENTS_BACKEND == "postgres":
+        # Postgres holds notifications until COMMIT and drops them on ROLLBACK
+        await db.execute(_NOTIFY_SQL, {"channel": PAYMENT_EVENTS_CHANNEL, "status": status, "references": references})
+    else:
+        db.sync_session.info.setdefault("payment_statuses", []).extend(
+            (reference, status) for reference in references
+        )
+
+def status_notification(reference, status: str):
+    """
+    With the postgres backend, a pg_notify of status for the reference
+    column, for a statement that writes the status to select as it goes
+    instead of calling publish_statuses; None with the memory backend.
+    """
+    if PAYMENT_EVENTS_BACKEND != "postgres":
+        return None
+    return func.pg_notify(PAYMENT_EVENTS_CHANNEL, literal(f"{status} ") + reference)
+
+@event.listens_for(PrimarySession, "after_commit")
+def _deliver_committed(session) -> None:
+    for reference, status in session.info.pop("payment_statuses", ()):
+        broker.deliver(reference, status)
+
+@event.listens_for(PrimarySession, "after_rollback")
+def _drop_rolled_back(session) -> None:
+    session.info.pop("payment_statuses", None)
+
+def _on_notification(connection, pid, channel, payload: str) -> None:
+    status, _, reference = payload.partition(" ")
+    broker.deliver(reference, status)
+
+async def run_payment_listener() -> None:
+    """LISTEN on a dedicated connection until cancelled, reconnecting when it drops"""
+    url = _async_database_url(PAYMENT_EVENTS_DATABASE_URL) if PAYMENT_EVENTS_DATABASE_URL else ASYNC_DATABASE_URL
+    engine = create_async_engine(
+        url,
+        poolclass=NullPool,
+        connect_args={"timeout": 10, "server_settings": {"application_name": "microloan_listener"}}
+    )
+    try:
+        while True:
+            lost = asyncio.Event()
+            try:
+                async with engine.connect() as conn:
+                    listener = (await conn.get_raw_connection()).driver_connection
+                    listener.add_termination_listener(lambda connection: lost.set())
+                    await listener.add_listener(PAYMENT_EVENTS_CHANNEL, _on_notification)
+                    broker.listening = True
+                    # Anything published while we were not listening was missed
+                    await broker.refresh()
+                    logger.info("Listening for payment status notifications")
+                    while not lost.is_set():
+                        try:
+                            await asyncio.wait_for(lost.wait(), LISTENER_PING_SECONDS)
+                        except asyncio.TimeoutError:
+                            await listener.execute("SELECT 1")
+                    logger.warning("Payment status listener connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Payment status listener failed; retrying")
+            finally:
+                broker.listening = False
+            await asyncio.sleep(LISTENER_RETRY_SECONDS * (0.5 + random.random()))
+    finally:
+        await engine.dispose()
+
+def start_payment_listener() -> Optional[asyncio.Task]:
+    if PAYMENT_EVENTS_BACKEND != "postgres":
+        return None
+    if DB_PGBOUNCER and not PAYMENT_EVENTS_DATABASE_URL:
+        logger.warning("DATABASE_URL looks like a PgBouncer pooler; set PAYMENT_EVENTS_DATABASE_URL to a direct connection for LISTEN")
+    return asyncio.create_task(run_payment_listener())
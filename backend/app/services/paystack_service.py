@@ -1,12 +1,40 @@
 import os
+import time
+import random
+import asyncio
 import httpx
 import hashlib
 import hmac
 from typing import Optional
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.metrics import PAYSTACK_ERRORS, PAYSTACK_LATENCY
 
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY", "")
 PAYSTACK_PUBLIC_KEY = os.getenv("PAYSTACK_PUBLIC_KEY", "")
-PAYSTACK_BASE_URL = "https://api.paystack.co"
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+
+# Shared client settings
+PAYSTACK_CONNECT_TIMEOUT = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", "5"))
+PAYSTACK_READ_TIMEOUT = float(os.getenv("PAYSTACK_READ_TIMEOUT", "15"))
+PAYSTACK_MAX_CONNECTIONS = int(os.getenv("PAYSTACK_MAX_CONNECTIONS", "20"))
+PAYSTACK_MAX_KEEPALIVE = int(os.getenv("PAYSTACK_MAX_KEEPALIVE", "10"))
+PAYSTACK_KEEPALIVE_EXPIRY = float(os.getenv("PAYSTACK_KEEPALIVE_EXPIRY", "30"))
+PAYSTACK_HTTP2 = os.getenv("PAYSTACK_HTTP2", "false").lower() == "true"
+
+# Latency budget and retries: every call, retries included, finishes within the deadline
+PAYSTACK_DEADLINE = float(os.getenv("PAYSTACK_DEADLINE", "10"))
+PAYSTACK_VERIFY_RETRIES = int(os.getenv("PAYSTACK_VERIFY_RETRIES", "2"))
+PAYSTACK_RETRY_BACKOFF = float(os.getenv("PAYSTACK_RETRY_BACKOFF", "0.2"))
+
+# Circuit breaker over all Paystack calls in this worker
+PAYSTACK_BREAKER_FAILURE_RATE = float(os.getenv("PAYSTACK_BREAKER_FAILURE_RATE", "0.5"))
+PAYSTACK_BREAKER_SLOW_SECONDS = float(os.getenv("PAYSTACK_BREAKER_SLOW_SECONDS", "5"))
+PAYSTACK_BREAKER_MIN_CALLS = int(os.getenv("PAYSTACK_BREAKER_MIN_CALLS", "10"))
+PAYSTACK_BREAKER_OPEN_SECONDS = float(os.getenv("PAYSTACK_BREAKER_OPEN_SECONDS", "30"))
+
+def _is_failure(response: httpx.Response) -> bool:
+    """Responses that mean Paystack itself is struggling; 4xx answers are healthy"""
+    return response.status_code >= 500 or response.status_code == 429
 
 class PaystackService:
     def __init__(self):
@@ -17,10 +45,121 @@ class PaystackService:
             "Authorization": f"Bearer {self.secret_key}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+        self.request_count = 0
+        self.error_count = 0
+        self.connection_count = 0
+        self.total_latency = 0.0
+        self.retry_count = 0
+        self.breaker = CircuitBreaker(
+            "Paystack",
+            failure_rate=PAYSTACK_BREAKER_FAILURE_RATE,
+            slow_call_rate=PAYSTACK_BREAKER_FAILURE_RATE,
+            slow_call_seconds=PAYSTACK_BREAKER_SLOW_SECONDS,
+            min_calls=PAYSTACK_BREAKER_MIN_CALLS,
+            open_seconds=PAYSTACK_BREAKER_OPEN_SECONDS
+        )
+    
+    async def start(self) -> None:
+        """Open the shared keep-alive client used for every Paystack call"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=PAYSTACK_HTTP2,
+                timeout=httpx.Timeout(
+                    PAYSTACK_READ_TIMEOUT,
+                    connect=PAYSTACK_CONNECT_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_connections=PAYSTACK_MAX_CONNECTIONS,
+                    max_keepalive_connections=PAYSTACK_MAX_KEEPALIVE,
+                    keepalive_expiry=PAYSTACK_KEEPALIVE_EXPIRY
+                )
+            )
+    
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _trace(self, event_name: str, info: dict) -> None:
+        # httpcore reports a TCP connect only when no pooled connection could be reused
+        if event_name == "connection.connect_tcp.complete":
+            self.connection_count += 1
+    
+    async def _request(self, operation: str, method: str, url: str, deadline: float, **kwargs) -> httpx.Response:
+        """One attempt, bounded by the overall deadline and guarded by the breaker"""
+        self.breaker.before_call()
+        if self._client is None:
+            await self.start()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise httpx.TimeoutException("Paystack deadline exceeded")
+        failed = True
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self._client.request(method, url, extensions={"trace": self._trace}, **kwargs),
+                remaining
+            )
+            failed = _is_failure(response)
+        except asyncio.TimeoutError:
+            self.error_count += 1
+            PAYSTACK_ERRORS.inc((operation,))
+            raise httpx.TimeoutException("Paystack deadline exceeded")
+        except Exception:
+            self.error_count += 1
+            PAYSTACK_ERRORS.inc((operation,))
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.request_count += 1
+            self.total_latency += elapsed
+            PAYSTACK_LATENCY.observe((operation,), elapsed)
+            self.breaker.record(failed, elapsed)
+        if response.is_error:
+            PAYSTACK_ERRORS.inc((operation,))
+        return response
+    
+    async def _call(self, operation: str, method: str, url: str, retries: int = 0, **kwargs) -> httpx.Response:
+        """
+        Make a call with up to `retries` extra attempts on transport errors
+        and 5xx/429 answers, sleeping a jittered exponential backoff between
+        them. Only idempotent calls should retry.
+        """
+        deadline = time.monotonic() + PAYSTACK_DEADLINE
+        for attempt in range(retries + 1):
+            try:
+                response = await self._request(operation, method, url, deadline, **kwargs)
+                if not _is_failure(response) or attempt == retries:
+                    return response
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+            # Full jitter, and never sleep past the deadline
+            backoff = random.uniform(0, PAYSTACK_RETRY_BACKOFF * 2 ** attempt)
+            if time.monotonic() + backoff >= deadline:
+                raise httpx.TimeoutException("Paystack deadline exceeded")
+            self.retry_count += 1
+            await asyncio.sleep(backoff)
+    
+    def stats(self) -> dict:
+        """Request, latency and connection-reuse counters for this worker"""
+        requests = self.request_count
+        return {
+            "requests": requests,
+            "errors": self.error_count,
+            "connections_opened": self.connection_count,
+            "connection_reuse_rate": 1 - self.connection_count / requests if requests else 0.0,
+            "avg_latency_ms": self.total_latency / requests * 1000 if requests else 0.0,
+            "retries": self.retry_count,
+            "breaker": self.breaker.stats()
+        }
     
     async def initialize_transaction(self, email: str, amount: int, reference: str, callback_url: Optional[str] = None, phone: Optional[str] = None) -> dict:
         """Initialize a Paystack transaction with M-Pesa support"""
-        url = f"{self.base_url}/transaction/initialize"
+        url = "/transaction/initialize"
         payload = {
             "email": email,
             "amount": amount * 100,  # Paystack uses cents
@@ -42,27 +181,28 @@ class PaystackService:
             payload["callback_url"] = callback_url
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(url, json=payload, headers=self.headers)
-                data = response.json()
-                
-                if data.get("status"):
-                    return {
-                        "success": True,
-                        "authorization_url": data["data"]["authorization_url"],
-                        "access_code": data["data"]["access_code"],
-                        "reference": data["data"]["reference"],
-                        "message": "Transaction initialized successfully"
-                    }
+            response = await self._call("initialize", "POST", url, json=payload)
+            data = response.json()
+            
+            if data.get("status"):
                 return {
-                    "success": False,
-                    "message": data.get("message", "Transaction initialization failed")
+                    "success": True,
+                    "authorization_url": data["data"]["authorization_url"],
+                    "access_code": data["data"]["access_code"],
+                    "reference": data["data"]["reference"],
+                    "message": "Transaction initialized successfully"
                 }
+            return {
+                "success": False,
+                "message": data.get("message", "Transaction initialization failed")
+            }
         except httpx.TimeoutException:
             return {
                 "success": False,
                 "message": "Request timeout. Please try again."
             }
+        except CircuitOpenError:
+            raise
         except Exception as e:
             return {
                 "success": False,
@@ -71,42 +211,42 @@ class PaystackService:
     
     async def verify_transaction(self, reference: str) -> dict:
         """Verify a Paystack transaction"""
-        url = f"{self.base_url}/transaction/verify/{reference}"
+        url = f"/transaction/verify/{reference}"
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=self.headers)
-                data = response.json()
+            response = await self._call("verify", "GET", url, retries=PAYSTACK_VERIFY_RETRIES)
+            data = response.json()
+            
+            if data.get("status"):
+                transaction_data = data.get("data", {})
+                status_value = transaction_data.get("status")
                 
-                if data.get("status"):
-                    transaction_data = data.get("data", {})
-                    status_value = transaction_data.get("status")
-                    
-                    if status_value == "success":
-                        return {
-                            "success": True,
-                            "status": "success",
-                            "amount": transaction_data.get("amount", 0) // 100,
-                            "reference": reference,
-                            "message": "Payment verified successfully",
-                            "customer_code": transaction_data.get("customer", {}).get("customer_code"),
-                            "authorization": transaction_data.get("authorization")
-                        }
-                    else:
-                        return {
-                            "success": False,
-                            "status": status_value,
-                            "amount": 0,
-                            "reference": reference,
-                            "message": f"Payment status: {status_value}"
-                        }
-                return {
-                    "success": False,
-                    "status": "failed",
-                    "amount": 0,
-                    "reference": reference,
-                    "message": data.get("message", "Verification failed")
-                }
+                if status_value == "success":
+                    return {
+                        "success": True,
+                        "status": "success",
+                        "amount": transaction_data.get("amount", 0) // 100,
+                        "reference": reference,
+                        "message": "Payment verified successfully",
+                        "customer_code": transaction_data.get("customer", {}).get("customer_code"),
+                        "authorization": transaction_data.get("authorization")
+                    }
+                else:
+                    return {
+                        "success": False,
+                        "status": status_value,
+                        "amount": 0,
+                        "reference": reference,
+                        "message": f"Payment status: {status_value}"
+                    }
+            # An API error (5xx, 429, 404...) says nothing about the payment itself
+            return {
+                "success": False,
+                "status": "error",
+                "amount": 0,
+                "reference": reference,
+                "message": data.get("message", "Verification failed")
+            }
         except httpx.TimeoutException:
             return {
                 "success": False,
@@ -115,6 +255,8 @@ class PaystackService:
                 "reference": reference,
                 "message": "Verification timeout. Please try again."
             }
+        except CircuitOpenError:
+            raise
         except Exception as e:
             return {
                 "success": False,
@@ -126,6 +268,9 @@ class PaystackService:
     
     def verify_webhook_signature(self, payload: bytes, signature: str) -> bool:
         """Verify Paystack webhook signature"""
+        # Without a secret anyone could sign with the empty key
+        if not self.secret_key or not signature:
+            return False
         computed_signature = hmac.new(
             self.secret_key.encode('utf-8'),
             payload,
@@ -135,22 +280,23 @@ class PaystackService:
     
     async def get_transaction_details(self, reference: str) -> dict:
         """Get detailed transaction information"""
-        url = f"{self.base_url}/transaction/{reference}"
+        url = f"/transaction/{reference}"
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=self.headers)
-                data = response.json()
-                
-                if data.get("status"):
-                    return {
-                        "success": True,
-                        "data": data.get("data", {})
-                    }
+            response = await self._call("details", "GET", url, retries=PAYSTACK_VERIFY_RETRIES)
+            data = response.json()
+            
+            if data.get("status"):
                 return {
-                    "success": False,
-                    "message": data.get("message", "Failed to get transaction details")
+                    "success": True,
+                    "data": data.get("data", {})
                 }
+            return {
+                "success": False,
+                "message": data.get("message", "Failed to get transaction details")
+            }
+        except CircuitOpenError:
+            raise
         except Exception as e:
             return {
                 "success": False,
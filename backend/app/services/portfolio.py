@@ -0,0 +1,190 @@
+import os
+import random
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Iterable
+from sqlalchemy import delete, func, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.loan import Loan
+from app.models.portfolio import PortfolioDaily
+
+# Loans still owed to us
+OUTSTANDING_STATUSES = {"pending", "approved", "disbursed", "overdue", "defaulted"}
+
+SUMMARY_FIELDS = ("loan_count", "principal", "fees", "total")
+
+# Rows each (day, status) total is split across, so concurrent loan writes
+# on the same day rarely wait on the same summary row
+PORTFOLIO_BUCKETS = int(os.getenv("PORTFOLIO_BUCKETS", "16"))
+
+def loan_day(created_at: datetime) -> date:
+    """UTC origination day of a loan; naive timestamps (SQLite) are already UTC"""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+class PortfolioDelta:
+    """Accumulates loan transitions and applies them as one upsert"""
+    
+    def __init__(self):
+        self.rows = defaultdict(lambda: [0, 0, 0, 0])
+    
+    def add(self, created_at: datetime, status: str, amount: int, fee: int, total: int, sign: int = 1) -> None:
+        self.add_day(loan_day(created_at), status, sign, sign * amount, sign * fee, sign * total)
+    
+    def add_day(self, day: date, status: str, loan_count: int, principal: int, fees: int, total: int) -> None:
+        """Add totals already grouped by origination day"""
+        row = self.rows[(day, status)]
+        row[0] += loan_count
+        row[1] += principal
+        row[2] += fees
+        row[3] += total
+    
+    def move(self, created_at: datetime, old_status: str, new_status: str, amount: int, fee: int, total: int) -> None:
+        self.add(created_at, old_status, amount, fee, total, sign=-1)
+        self.add(created_at, new_status, amount, fee, total)
+    
+    async def apply(self, db: AsyncSession) -> None:
+        """
+        Add the accumulated deltas to one random bucket of portfolio_daily in
+        the caller's transaction. The rows stay locked until commit, so call
+        it last.
+        """
+        # Sorted so concurrent writers to the same bucket lock rows in the same order
+        bucket = random.randrange(PORTFOLIO_BUCKETS)
+        values = [
+            {"day": day, "status": status, "bucket": bucket, **dict(zip(SUMMARY_FIELDS, row))}
+            for (day, status), row in sorted(self.rows.items())
+            if any(row)
+        ]
+        if not values:
+            return
+        
+        insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        await db.execute(_accumulate(insert(PortfolioDaily).values(values)))
+
+def _accumulate(statement):
+    """Add the inserted totals to any existing row of the same day, status and bucket"""
+    return statement.on_conflict_do_update(
+        index_elements=["day", "status", "bucket"],
+        set_={
+            **{field: getattr(PortfolioDaily, field) + statement.excluded[field] for field in SUMMARY_FIELDS},
+            "updated_at": func.now()
+        }
+    )
+
+def move_statement(moved, to_status: str):
+    """
+    PostgreSQL upsert moving the loans in moved, a CTE of (created_at,
+    status, amount, fee, total) with the status each loan had, to
+    to_status in one random bucket. Lets a statement that moves loans
+    update the summary in the same round trip.
+    """
+    day = func.date(func.timezone("UTC", moved.c.created_at))
+    changes = union_all(
+        select(
+            day.label("day"), moved.c.status.label("status"), literal(-1).label("loan_count"),
+            (-moved.c.amount).label("principal"), (-moved.c.fee).label("fees"), (-moved.c.total).label("total")
+        ),
+        select(day, literal(to_status), literal(1), moved.c.amount, moved.c.fee, moved.c.total)
+    ).subquery()
+    totals = (
+        select(
+            changes.c.day, changes.c.status, literal(random.randrange(PORTFOLIO_BUCKETS)),
+            *[func.sum(changes.c[field]) for field in SUMMARY_FIELDS]
+        )
+        .group_by(changes.c.day, changes.c.status)
+        # Same lock order as PortfolioDelta.apply
+        .order_by(changes.c.day, changes.c.status)
+    )
+    return _accumulate(
+        pg_insert(PortfolioDaily).from_select(["day", "status", "bucket", *SUMMARY_FIELDS], totals)
+    )
+
+def _day_expression(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        return func.date(func.timezone("UTC", Loan.created_at))
+    return func.date(Loan.created_at)
+
+async def compute_portfolio(db: AsyncSession) -> dict[tuple[date, str], tuple[int, int, int, int]]:
+    """Recompute the summary from the loans table with a full GROUP BY"""
+    day = _day_expression(db).label("day")
+    result = await db.execute(
+        select(day, Loan.status, func.count(), func.sum(Loan.amount), func.sum(Loan.fee), func.sum(Loan.total))
+        .group_by(day, Loan.status)
+    )
+    return {
+        (date.fromisoformat(row_day) if isinstance(row_day, str) else row_day, status): tuple(int(value) for value in totals)
+        for row_day, status, *totals in result.all()
+    }
+
+def summed_portfolio():
+    """portfolio_daily with its buckets added up, one row per (day, status)"""
+    return select(
+        PortfolioDaily.day, PortfolioDaily.status,
+        *[func.sum(getattr(PortfolioDaily, field)).label(field) for field in SUMMARY_FIELDS]
+    ).group_by(PortfolioDaily.day, PortfolioDaily.status)
+
+async def stored_portfolio(db: AsyncSession) -> dict[tuple[date, str], tuple[int, int, int, int]]:
+    result = await db.execute(summed_portfolio())
+    return {
+        (day, status): tuple(int(value) for value in totals)
+        for day, status, *totals in result.all()
+        if any(totals)
+    }
+
+def diff_portfolio(expected: dict, actual: dict) -> list[dict]:
+    """Summary rows whose stored totals differ from the recomputed ones"""
+    zero = (0,) * len(SUMMARY_FIELDS)
+    return [
+        {
+            "day": day.isoformat(),
+            "status": status,
+            "expected": dict(zip(SUMMARY_FIELDS, expected.get((day, status), zero))),
+            "actual": dict(zip(SUMMARY_FIELDS, actual.get((day, status), zero)))
+        }
+        for day, status in sorted(set(expected) | set(actual))
+        if expected.get((day, status), zero) != actual.get((day, status), zero)
+    ]
+
+async def rebuild_portfolio(db: AsyncSession, check_only: bool = False) -> list[dict]:
+    """
+    Recompute portfolio_daily from scratch and return the rows that had
+    drifted. Unless check_only, the table is replaced in the caller's
+    transaction, which the caller commits; the rebuilt totals go in
+    bucket 0.
+    """
+    if not check_only and db.bind.dialect.name == "postgresql":
+        # Hold off loan writes (and their incremental updates) until the caller commits
+        await db.execute(text("LOCK TABLE loans IN SHARE ROW EXCLUSIVE MODE"))
+    expected = await compute_portfolio(db)
+    drift = diff_portfolio(expected, await stored_portfolio(db))
+    if not check_only:
+        await db.execute(delete(PortfolioDaily))
+        if expected:
+            await db.execute(PortfolioDaily.__table__.insert(), [
+                {"day": day, "status": status, **dict(zip(SUMMARY_FIELDS, totals))}
+                for (day, status), totals in sorted(expected.items())
+            ])
+    return drift
+
+def summarize(rows: Iterable[PortfolioDaily]) -> dict:
+    """Headline figures from summary rows"""
+    totals = {
+        "loan_count": 0,
+        "outstanding_principal": 0,
+        "outstanding_total": 0,
+        "fees_earned": 0,
+        "repaid_count": 0,
+    }
+    for row in rows:
+        totals["loan_count"] += row.loan_count
+        if row.status in OUTSTANDING_STATUSES:
+            totals["outstanding_principal"] += row.principal
+            totals["outstanding_total"] += row.total
+        elif row.status == "repaid":
+            totals["fees_earned"] += row.fees
+            totals["repaid_count"] += row.loan_count
+    return totals
@@ -0,0 +1,137 @@
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select
+from app.models.transaction import Transaction
+from app.services.paystack_service import paystack_service
+from app.services.settlement import FINAL_FAILURE_STATUSES, fail_references, settle_references
+from app.utils.auth import invalidate_user_cache
+from app.utils.circuit_breaker import CircuitOpenError, OPEN
+from app.utils.database import AsyncSessionLocal
+
+logger = logging.getLogger("reconciliation")
+
+RECONCILE_INTERVAL_MINUTES = float(os.getenv("RECONCILE_INTERVAL_MINUTES", "0"))  # 0 disables the in-process task
+RECONCILE_OLDER_THAN_MINUTES = float(os.getenv("RECONCILE_OLDER_THAN_MINUTES", "15"))
+RECONCILE_PAGE_SIZE = int(os.getenv("RECONCILE_PAGE_SIZE", "500"))
+RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "10"))
+
+@dataclass
+class ReconcileReport:
+    checked: int = 0
+    settled: int = 0
+    failed: int = 0
+    unresolved: int = 0
+    elapsed: float = 0.0
+    latencies: list = field(default_factory=list)
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self) -> dict:
+        return {
+            "checked": self.checked,
+            "settled": self.settled,
+            "failed": self.failed,
+            "unresolved": self.unresolved,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_per_s": round(self.checked / self.elapsed, 1) if self.elapsed else 0.0,
+            "latency_ms": {
+                f"p{pct}": round(self.percentile(pct) * 1000, 2) for pct in (50, 95, 99)
+            }
+        }
+
+async def _verify_page(references: list[str], semaphore: asyncio.Semaphore, report: ReconcileReport) -> list[dict]:
+    async def verify(reference: str) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await paystack_service.verify_transaction(reference)
+            except CircuitOpenError:
+                return {"success": False, "status": "circuit_open", "reference": reference}
+            report.latencies.append(time.perf_counter() - start)
+            return result
+    
+    return await asyncio.gather(*[verify(reference) for reference in references])
+
+async def reconcile_pending(
+    older_than_minutes: float = RECONCILE_OLDER_THAN_MINUTES,
+    page_size: int = RECONCILE_PAGE_SIZE,
+    concurrency: int = RECONCILE_CONCURRENCY
+) -> ReconcileReport:
+    """
+    Verify stale pending transactions against Paystack and apply the
+    outcomes in bulk, one page of transactions at a time.
+    """
+    report = ReconcileReport()
+    semaphore = asyncio.Semaphore(concurrency)
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=older_than_minutes)
+    last_id = 0
+    start = time.perf_counter()
+    
+    while True:
+        async with AsyncSessionLocal() as db:
+            page = (await db.execute(
+                select(Transaction.id, Transaction.reference)
+                .where(
+                    Transaction.status == "pending",
+                    Transaction.created_at < cutoff,
+                    Transaction.id > last_id
+                )
+                .order_by(Transaction.id)
+                .limit(page_size)
+            )).all()
+        if not page:
+            break
+        last_id = page[-1].id
+        
+        # No connection is held while the Paystack calls are in flight
+        results = await _verify_page([row.reference for row in page], semaphore, report)
+        
+        succeeded = [result["reference"] for result in results if result.get("success")]
+        failed = [
+            result["reference"] for result in results
+            if not result.get("success") and result.get("status") in FINAL_FAILURE_STATUSES
+        ]
+        
+        async with AsyncSessionLocal() as db:
+            settlement = await settle_references(db, succeeded)
+            await fail_references(db, failed)
+            await db.commit()
+        
+        for phone in settlement.phones:
+            invalidate_user_cache(phone)
+        report.checked += len(page)
+        report.settled += len(settlement.references)
+        report.failed += len(failed)
+        report.unresolved += len(page) - len(succeeded) - len(failed)
+        
+        if paystack_service.breaker.state == OPEN:
+            logger.warning("Paystack circuit is open; stopping reconciliation after %d transactions", report.checked)
+            break
+    
+    report.elapsed = time.perf_counter() - start
+    return report
+
+async def run_reconciliation_loop(interval_minutes: float = RECONCILE_INTERVAL_MINUTES) -> None:
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        try:
+            report = await reconcile_pending()
+            logger.info("Reconciliation finished: %s", report.summary())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Reconciliation run failed")
+
+def start_reconciliation_task() -> Optional[asyncio.Task]:
+    if RECONCILE_INTERVAL_MINUTES <= 0:
+        return None
+    return asyncio.create_task(run_reconciliation_loop())
@@ -0,0 +1,155 @@
+from dataclasses import dataclass, field
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.credit_scoring import HISTORY_COLUMNS, history_query, rescore_users, write_scores
+from app.services.payment_events import publish_statuses, status_notification
+from app.services.portfolio import PortfolioDelta, move_statement
+
+# Statuses Paystack reports for a transaction that can no longer succeed. An
+# abandoned checkout can still be completed, so it stays pending.
+FINAL_FAILURE_STATUSES = {"failed", "reversed"}
+# A payment Paystack confirms as successful is applied even if it was marked
+# failed earlier, e.g. by a verify that caught a Paystack outage
+SETTLEABLE_STATUSES = ("pending", "failed")
+
+@dataclass
+class Settlement:
+    references: list[str] = field(default_factory=list)  # moved to success by this call
+    phones: list[str] = field(default_factory=list)  # users whose loan limit changed
+
+async def settle_references(db: AsyncSession, references: list[str]) -> Settlement:
+    """
+    Mark payments Paystack confirmed as successful, their loans repaid and
+    rescore the owners' loan limits, using conditional set-based updates
+    in the caller's transaction. The portfolio summary moves with the
+    loans. Only rows not yet successful are touched, so settling a
+    reference twice (webhook and verify racing, Paystack retries) is a
+    no-op. Clients waiting on a reference are told when the caller
+    commits. On PostgreSQL the settlement, summary and notifications are
+    one statement. The caller commits and then invalidates the cached
+    records of the returned phones.
+    """
+    if not references:
+        return Settlement()
+    if db.bind.dialect.name == "postgresql":
+        return await _settle_postgresql(db, references)
+    
+    settled = (await db.execute(
+        update(Transaction)
+        .where(Transaction.reference.in_(references), Transaction.status.in_(SETTLEABLE_STATUSES))
+        .values(status="success")
+        .returning(Transaction.reference, Transaction.loan_id)
+        .execution_options(synchronize_session=False)
+    )).all()
+    if not settled:
+        return Settlement()
+    settlement = Settlement(references=[row.reference for row in settled])
+    await publish_statuses(db, settlement.references, "success")
+    loan_ids = [row.loan_id for row in settled]
+    
+    # Locked first so each loan's previous status is known for the summary
+    loans = (await db.execute(
+        select(Loan.id, Loan.user_id, Loan.status, Loan.amount, Loan.fee, Loan.total, Loan.created_at)
+        .where(Loan.id.in_(set(loan_ids)), Loan.status != "repaid")
+        .order_by(Loan.id)
+        .with_for_update()
+    )).all()
+    if not loans:
+        return settlement
+    
+    await db.execute(
+        update(Loan)
+        .where(Loan.id.in_([loan.id for loan in loans]))
+        .values(status="repaid")
+        .execution_options(synchronize_session=False)
+    )
+    settlement.phones = await rescore_users(db, {loan.user_id for loan in loans})
+    
+    delta = PortfolioDelta()
+    for loan in loans:
+        delta.move(loan.created_at, loan.status, "repaid", loan.amount, loan.fee, loan.total)
+    await delta.apply(db)
+    return settlement
+
+async def _settle_postgresql(db: AsyncSession, references: list[str]) -> Settlement:
+    """settle_references in one round trip: each step is a CTE feeding the next"""
+    transactions, loans = Transaction.__table__, Loan.__table__
+    settled = (
+        update(transactions)
+        .where(transactions.c.reference.in_(references), transactions.c.status.in_(SETTLEABLE_STATUSES))
+        .values(status="success")
+        .returning(transactions.c.reference, transactions.c.loan_id)
+        .cte("settled")
+    )
+    # Locked first so each loan's previous status is known for the summary
+    previous = (
+        select(loans.c.id, loans.c.user_id, loans.c.status, loans.c.amount, loans.c.fee, loans.c.total, loans.c.created_at)
+        .where(loans.c.id.in_(select(settled.c.loan_id)), loans.c.status != "repaid")
+        .order_by(loans.c.id)
+        .with_for_update()
+        .cte("previous")
+    )
+    repaid = (
+        update(loans)
+        .where(loans.c.id == previous.c.id)
+        .values(status="repaid")
+        .returning(*previous.c)
+        .cte("repaid")
+    )
+    summary = move_statement(repaid, "repaid").cte("summary")
+    
+    # The owners' score inputs. The statement cannot see its own loan
+    # updates, so the loans it repays are overlaid as repaid now.
+    owners = select(repaid.c.user_id)
+    now_repaid = repaid.c.id.is_not(None)
+    owner_loans = (
+        select(
+            loans.c.user_id, loans.c.amount, loans.c.duration, loans.c.created_at,
+            case((now_repaid, "repaid"), else_=loans.c.status).label("status"),
+            case((now_repaid, func.now()), else_=loans.c.updated_at).label("updated_at")
+        )
+        .outerjoin(repaid, repaid.c.id == loans.c.id)
+        .where(loans.c.user_id.in_(owners))
+        .subquery("owner_loans")
+    )
+    history = (
+        history_query(owner_loans).add_columns(User.phone)
+        .where(User.id.in_(owners))
+        .group_by(User.phone)
+        .subquery("history")
+    )
+    
+    notification = status_notification(settled.c.reference, "success")
+    score_columns = [history.c[name] for name in (*HISTORY_COLUMNS, "phone")]
+    rows = (await db.execute(
+        select(settled.c.reference, *score_columns, *([notification] if notification is not None else []))
+        .select_from(
+            settled
+            .outerjoin(repaid, repaid.c.id == settled.c.loan_id)
+            .outerjoin(history, history.c.user_id == repaid.c.user_id)
+        )
+        .add_cte(summary)
+    )).all()
+    settlement = Settlement(references=[row.reference for row in rows])
+    if notification is None:
+        await publish_statuses(db, settlement.references, "success")
+    
+    # Only a changed limit costs another statement; scoring itself is NumPy
+    histories = {row.user_id: row[1:len(score_columns) + 1] for row in rows if row.user_id is not None}
+    settlement.phones = await write_scores(db, list(histories.values()))
+    return settlement
+
+async def fail_references(db: AsyncSession, references: list[str]) -> None:
+    """Mark still-pending payments as failed"""
+    if references:
+        failed = (await db.scalars(
+            update(Transaction)
+            .where(Transaction.reference.in_(references), Transaction.status == "pending")
+            .values(status="failed")
+            .returning(Transaction.reference)
+            .execution_options(synchronize_session=False)
+        )).all()
+        await publish_statuses(db, list(failed), "failed")
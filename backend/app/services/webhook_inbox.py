@@ -0,0 +1,87 @@
+import os
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.webhook_event import WebhookEvent
+from app.services.settlement import settle_references
+from app.utils.auth import invalidate_user_cache
+from app.utils.database import AsyncSessionLocal
+
+logger = logging.getLogger("webhook_inbox")
+
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "500"))
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1.0"))
+WEBHOOK_CONSUMER_ENABLED = os.getenv("WEBHOOK_CONSUMER_ENABLED", "true").lower() == "true"
+
+# Set by the webhook endpoint so the consumer wakes up without waiting for the next poll
+_new_events = asyncio.Event()
+
+async def enqueue_event(db: AsyncSession, payload: bytes, data: dict) -> None:
+    """Append a verified webhook event to the inbox; duplicates are dropped"""
+    values = {
+        "event": data.get("event") or "unknown",
+        "reference": (data.get("data") or {}).get("reference"),
+        "payload": payload.decode("utf-8")
+    }
+    insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    await db.execute(
+        insert(WebhookEvent).values(**values).on_conflict_do_nothing(
+            index_elements=["event", "reference"]
+        )
+    )
+    await db.commit()
+    _new_events.set()
+
+async def process_pending_events(db: AsyncSession, batch_size: int = WEBHOOK_BATCH_SIZE) -> int:
+    """Apply one batch of unprocessed inbox events; returns how many were consumed"""
+    events = (await db.execute(
+        select(WebhookEvent.id, WebhookEvent.event, WebhookEvent.reference)
+        .where(WebhookEvent.processed_at.is_(None))
+        .order_by(WebhookEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )).all()
+    if not events:
+        return 0
+    
+    references = list({event.reference for event in events if event.event == "charge.success" and event.reference})
+    settlement = await settle_references(db, references)
+    
+    await db.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id.in_([event.id for event in events]))
+        .values(processed_at=func.now())
+    )
+    await db.commit()
+    
+    for phone in settlement.phones:
+        invalidate_user_cache(phone)
+    return len(events)
+
+async def run_webhook_consumer(poll_interval: float = WEBHOOK_POLL_INTERVAL) -> None:
+    """Drain the inbox until cancelled, sleeping between polls when it is empty"""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                processed = await process_pending_events(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Webhook batch failed; will retry")
+            processed = 0
+        
+        if processed == 0:
+            _new_events.clear()
+            try:
+                await asyncio.wait_for(_new_events.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+def start_webhook_consumer() -> Optional[asyncio.Task]:
+    if not WEBHOOK_CONSUMER_ENABLED:
+        return None
+    return asyncio.create_task(run_webhook_consumer())
@@ -1,12 +1,18 @@
 import os
+import time
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.utils.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.cache import TTLCache
+from app.utils.database import get_async_db, read_async_engine
+from app.utils.read_replica import get_read_db
 from app.models.user import User
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -14,20 +20,88 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing: bcrypt cost and the worker pool it runs on
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread or process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+# Hashes with a different cost factor are reported as deprecated and rehashed on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    # Bcrypt has a 72-byte limit
-    if len(plain_password.encode('utf-8')) > 72:
-        plain_password = plain_password[:72]
-    return pwd_context.verify(plain_password, hashed_password)
+# Phones allowed to use the /api/admin endpoints
+ADMIN_PHONES = {phone.strip() for phone in os.getenv("ADMIN_PHONES", "").split(",") if phone.strip()}
 
-def get_password_hash(password: str) -> str:
+# Per-worker caches for the authenticated request path
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+# Decoded access tokens live until their own exp claim
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+_USER_CACHE_COLUMNS = [column.key for column in User.__table__.columns if column.key != "password_hash"]
+
+_password_executor: Optional[Executor] = None
+_password_pending = 0
+
+def _truncate_password(password: str) -> str:
     # Bcrypt has a 72-byte limit
     if len(password.encode('utf-8')) > 72:
         password = password[:72]
-    return pwd_context.hash(password)
+    return password
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(_truncate_password(plain_password), hashed_password)
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(_truncate_password(password))
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(_truncate_password(plain_password), hashed_password)
+
+def get_password_executor() -> Executor:
+    global _password_executor
+    if _password_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _password_executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                thread_name_prefix="bcrypt"
+            )
+    return _password_executor
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+async def _run_password_task(func, *args):
+    """Run a bcrypt call on the worker pool, rejecting work beyond the queue cap"""
+    global _password_pending
+    if _password_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_executor(), func, *args)
+    finally:
+        _password_pending -= 1
+
+async def hash_password(password: str) -> str:
+    return await _run_password_task(get_password_hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash when the stored one is deprecated"""
+    return await _run_password_task(_verify_and_update, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -57,21 +131,61 @@ def decode_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def invalidate_user_cache(phone: str) -> None:
+    """Drop a cached user record; call after any write to that user's row"""
+    user_cache.pop(phone)
+
+def _decode_access_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_cache.set(token, payload, ttl=payload.get("exp", 0) - time.time())
+    return payload
+
+async def _authenticate(token: str, db: AsyncSession, cache: bool = True) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_access_token(token)
         phone: str = payload.get("sub")
         token_type: str = payload.get("type")
         if phone is None or token_type != "access":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.phone == phone).first()
+    
+    # Cached users are returned as detached User instances without the password hash
+    cached = user_cache.get(phone)
+    if cached is not None:
+        return User(**cached)
+    
+    user = await db.scalar(select(User).where(User.phone == phone))
     if user is None:
         raise credentials_exception
+    if cache:
+        user_cache.set(phone, {key: getattr(user, key) for key in _USER_CACHE_COLUMNS})
     return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    return await _authenticate(token, db)
+
+async def get_current_user_read(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)
+) -> User:
+    """
+    get_current_user for read-only routes. A cache miss is looked up in the
+    read session; rows read from the replica are not cached, so replica lag
+    never reaches the write routes.
+    """
+    return await _authenticate(token, db, cache=db.bind is not read_async_engine)
+
+async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.phone not in ADMIN_PHONES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
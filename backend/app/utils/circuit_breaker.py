@@ -0,0 +1,112 @@
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Opens when, over the last `window` calls (and at least `min_calls`),
+    the share of failures or of calls slower than `slow_call_seconds`
+    reaches its threshold. After `open_seconds` it lets `half_open_probes`
+    calls through: if they all succeed it closes, any failure reopens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_rate: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        window: int = 50,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 3
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        # (failed, slow) per call, most recent last
+        self.calls: deque = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probes_started = 0
+        self.probes_succeeded = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.retry_after())
+            self.state = HALF_OPEN
+            self.probes_started = 0
+            self.probes_succeeded = 0
+        if self.state == HALF_OPEN:
+            # A probe that never reported back (cancelled) must not wedge the breaker
+            if self.probes_started >= self.half_open_probes and time.monotonic() - self.opened_at > 2 * self.open_seconds:
+                self._open()
+                raise CircuitOpenError(self.name, self.retry_after())
+            if self.probes_started >= self.half_open_probes:
+                self.rejected += 1
+                # Probes are in flight; callers may try again shortly
+                raise CircuitOpenError(self.name, 1.0)
+            self.probes_started += 1
+
+    def record(self, failed: bool, duration: float) -> None:
+        slow = duration >= self.slow_call_seconds
+        if self.state == OPEN:
+            # Calls that were already in flight when the breaker opened
+            return
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                self._open()
+                return
+            self.probes_succeeded += 1
+            if self.probes_succeeded >= self.half_open_probes:
+                self.state = CLOSED
+                self.calls.clear()
+            return
+
+        self.calls.append((failed, slow))
+        if self.state == CLOSED and len(self.calls) >= self.min_calls:
+            failures = sum(1 for call_failed, _ in self.calls if call_failed)
+            slow_calls = sum(1 for _, call_slow in self.calls if call_slow)
+            if failures / len(self.calls) >= self.failure_rate or slow_calls / len(self.calls) >= self.slow_call_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self.calls.clear()
+
+    def stats(self) -> dict:
+        calls = len(self.calls)
+        return {
+            "state": self.state,
+            "retry_after_s": round(self.retry_after(), 1) if self.state == OPEN else 0.0,
+            "window_calls": calls,
+            "window_failure_rate": sum(1 for failed, _ in self.calls if failed) / calls if calls else 0.0,
+            "window_slow_rate": sum(1 for _, slow in self.calls if slow) / calls if calls else 0.0,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
@@ -1,8 +1,11 @@
 import os
-from sqlalchemy import create_engine
+import time
+import uuid
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 # Get database URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -25,32 +28,87 @@ if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
 if not DATABASE_URL:
     DATABASE_URL = "sqlite:///./microloan.db"
 
+# Connection pool settings. DB_POOL_MODE=queue keeps a per-worker pool of
+# connections; DB_POOL_MODE=null opens a fresh connection for every session.
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue")
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Connection budget shared by all workers; each worker gets an even share unless DB_POOL_SIZE is set
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "10"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(max(1, DB_MAX_CONNECTIONS // max(1, WEB_CONCURRENCY)))))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "0" if IS_PRODUCTION else "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# PgBouncer in transaction mode (Supabase pooler, port 6543) cannot keep server-side prepared statements
+DB_PGBOUNCER = os.getenv(
+    "DB_PGBOUNCER",
+    str(bool(DATABASE_URL and ("pooler.supabase.com" in DATABASE_URL or ":6543" in DATABASE_URL)))
+).lower() == "true"
+
+class PoolMetrics:
+    """Checkout wait-time and overflow counters for one engine's pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.peak_overflow = 0
+
+    def record(self, wait: float, overflow: int) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.peak_overflow = max(self.peak_overflow, overflow)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record(time.perf_counter() - start, self.overflow())
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+def _pool_kwargs(poolclass) -> dict:
+    if DB_POOL_MODE == "null":
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True
+    }
+
 # Create engine with appropriate settings
 if DATABASE_URL and ("supabase" in DATABASE_URL or "postgresql" in DATABASE_URL):
     # PostgreSQL/Supabase configuration
-    if IS_PRODUCTION:
-        # Production: Use NullPool for Render with Supabase
-        # NullPool avoids connection pooling issues with Render's ephemeral filesystem
-        engine = create_engine(
-            DATABASE_URL,
-            poolclass=NullPool,
-            connect_args={
-                "connect_timeout": 10,
-                "application_name": "microloan_app"
-            },
-            echo=False
-        )
-    else:
-        # Development: Use QueuePool with connection pooling
-        engine = create_engine(
-            DATABASE_URL,
-            poolclass=QueuePool,
-            pool_size=5,
-            max_overflow=10,
-            pool_recycle=3600,
-            connect_args={"connect_timeout": 10},
-            echo=False
-        )
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={
+            "connect_timeout": 10,
+            "application_name": "microloan_app"
+        },
+        echo=False,
+        **_pool_kwargs(InstrumentedQueuePool)
+    )
 else:
     # SQLite for local development only
     if IS_PRODUCTION:
@@ -60,7 +118,94 @@ else:
         connect_args={"check_same_thread": False}
     )
 
+def _async_database_url(url: str) -> str:
+    """Map a sync driver URL onto its async driver equivalent"""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgresql+psycopg2://"):
+        return url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+
+def _create_async_engine(url: str, pgbouncer: bool, read_only: bool = False):
+    if not url.startswith("postgresql+asyncpg"):
+        return create_async_engine(url)
+    server_settings = {"application_name": "microloan_app"}
+    if read_only:
+        # Writes fail on a replica anyway; make a second primary used for testing behave the same
+        server_settings["default_transaction_read_only"] = "on"
+    async_connect_args = {"timeout": 10, "server_settings": server_settings}
+    if pgbouncer:
+        # Statements prepared on one server connection are not visible on the next
+        async_connect_args.update({
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__"
+        })
+    return create_async_engine(
+        url,
+        connect_args=async_connect_args,
+        echo=False,
+        **_pool_kwargs(InstrumentedAsyncQueuePool)
+    )
+
+# Async engine used by the request path; mirrors the sync engine settings above
+async_engine = _create_async_engine(ASYNC_DATABASE_URL, DB_PGBOUNCER)
+
+# Optional read replica for read-only routes (see app/utils/read_replica.py); it gets its own pool
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+if DATABASE_READ_URL and IS_PRODUCTION and "postgresql" not in DATABASE_READ_URL:
+    raise ValueError("DATABASE_READ_URL must be a PostgreSQL connection string for production")
+read_async_engine = _create_async_engine(
+    _async_database_url(DATABASE_READ_URL),
+    os.getenv(
+        "DB_PGBOUNCER", str("pooler.supabase.com" in DATABASE_READ_URL or ":6543" in DATABASE_READ_URL)
+    ).lower() == "true",
+    read_only=True
+) if DATABASE_READ_URL else None
+
+def pool_status(engine) -> dict:
+    """Current pool gauges plus checkout wait-time and overflow counters"""
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"pool": type(pool).__name__}
+    metrics = pool.metrics
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "checkouts": metrics.checkouts,
+        "avg_wait_ms": metrics.total_wait / metrics.checkouts * 1000 if metrics.checkouts else 0.0,
+        "max_wait_ms": metrics.max_wait * 1000,
+        "timeouts": metrics.timeouts,
+        "peak_overflow": metrics.peak_overflow
+    }
+
+class PrimarySession(Session):
+    """Sessions on the primary; their commits start a caller's read-your-writes window"""
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=PrimarySession,
+    autoflush=False,
+    expire_on_commit=False
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=read_async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+) if read_async_engine is not None else None
 Base = declarative_base()
 
 def get_db():
@@ -71,3 +216,7 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Async database session dependency for FastAPI"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,36 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response, status
+
+# Per-user data: browsers may store it but must revalidate every time
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+def weak_etag(*parts) -> str:
+    """Weak validator over the version columns of a response (ids, updated_at, counts)"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match, which may list several tags"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    expected = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == expected for tag in header.split(","))
+
+def check_etag(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Returns a bodiless 304 when the client already holds this version;
+    otherwise sets the validator headers on the response and returns None.
+    """
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
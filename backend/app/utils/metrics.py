@@ -0,0 +1,180 @@
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is a bisect and three additions"""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class GaugeCallback:
+    """Gauges read at scrape time from a callback returning {name: value}"""
+
+    def __init__(self, prefix: str, documentation: str, callback: Callable[[], dict]):
+        self.prefix = prefix
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, value in self.callback().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = f"{self.prefix}_{key}"
+                lines += [f"# HELP {name} {self.documentation}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+        return lines
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ("method", "route", "status")
+)
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "db_statements_per_request", "SQL statements executed while handling one request",
+    ("route",), STATEMENT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Time spent executing SQL while handling one request",
+    ("route",)
+)
+DB_STATEMENTS = Counter("db_statements_total", "SQL statements executed, including background tasks")
+DB_TIME = Counter("db_time_seconds_total", "Time spent executing SQL, including background tasks")
+PAYSTACK_LATENCY = Histogram(
+    "paystack_request_duration_seconds", "Outbound Paystack call latency",
+    ("operation",)
+)
+PAYSTACK_ERRORS = Counter(
+    "paystack_request_errors_total", "Paystack calls that raised or returned an HTTP error status",
+    ("operation",)
+)
+LOAN_TRANSITIONS = Counter(
+    "loan_status_transitions_total", "Loans moved between statuses by the overdue sweeper",
+    ("from_status", "to_status")
+)
+
+REGISTRY: list = [
+    HTTP_LATENCY, DB_STATEMENTS_PER_REQUEST, DB_TIME_PER_REQUEST,
+    DB_STATEMENTS, DB_TIME, PAYSTACK_LATENCY, PAYSTACK_ERRORS, LOAN_TRANSITIONS
+]
+
+def register_gauges(prefix: str, documentation: str, callback: Callable[[], dict]) -> None:
+    REGISTRY.append(GaugeCallback(prefix, documentation, callback))
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+# [statement count, seconds] for the request being handled in this context
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+def instrument_engine(engine) -> None:
+    """Count statements and time spent in SQL on a (sync) engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        DB_STATEMENTS.inc()
+        DB_TIME.inc(amount=elapsed)
+        stats = _request_db.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request and attributing its SQL work to the matched route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_db.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_db.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot blow up cardinality
+            route_path = route.path if route is not None else "unmatched"
+            HTTP_LATENCY.observe((scope["method"], route_path, status_code), elapsed)
+            DB_STATEMENTS_PER_REQUEST.observe((route_path,), stats[0])
+            DB_TIME_PER_REQUEST.observe((route_path,), stats[1])
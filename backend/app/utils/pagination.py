@@ -0,0 +1,80 @@
+import json
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import literal, select, true, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import GenericFunction
+from sqlalchemy.types import DateTime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class keyset_time(GenericFunction):
+    """A timestamp as pages are ordered and compared on; the column itself except on SQLite"""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(keyset_time)
+def _keyset_time_default(element, compiler, **kw):
+    return compiler.process(list(element.clauses)[0], **kw)
+
+@compiles(keyset_time, "sqlite")
+def _keyset_time_sqlite(element, compiler, **kw):
+    # SQLite keeps timestamps as text: now() writes no fraction, bound datetimes
+    # write six digits, so the strings of one instant differ. Normalize to
+    # seconds plus a six-digit fraction; julianday() and %f stop at milliseconds.
+    value = compiler.process(list(element.clauses)[0], **kw)
+    return "(strftime('%Y-%m-%d %H:%M:%S', {0}) || '.' || substr(substr({0}, 21) || '000000', 1, 6))".format(value)
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque keyset cursor pointing just past the given (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def keyset_page(query, created_at_column, id_column, cursor: Optional[str], limit: int):
+    """Order newest first on (created_at, id) and start after the cursor; fetches one extra row"""
+    sort_time = keyset_time(created_at_column)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        bound = keyset_time(literal(created_at, created_at_column.type))
+        query = query.where(tuple_(sort_time, id_column) < tuple_(bound, row_id))
+    return query.order_by(sort_time.desc(), id_column.desc()).limit(limit + 1)
+
+def versioned_page(version, query, created_at_column, id_column, cursor: Optional[str], limit: int):
+    """
+    keyset_page of query with the columns of version, a one-row probe, on
+    every row, so a listing and its ETag take one round trip. An empty page
+    still returns one row, whose page columns are NULL; split_versioned
+    separates the two.
+    """
+    probe = version.subquery("version")
+    page = keyset_page(query, created_at_column, id_column, cursor, limit).subquery("page")
+    return (
+        select(probe, page)
+        .select_from(probe.outerjoin(page, true()))
+        .order_by(keyset_time(page.c[created_at_column.key]).desc(), page.c[id_column.key].desc())
+    )
+
+def split_versioned(rows: list, version_width: int) -> Tuple[tuple, list]:
+    """The version probe and the page rows (which have an id) of a versioned_page result"""
+    return tuple(rows[0][:version_width]), [row for row in rows if row.id is not None]
+
+def next_cursor(rows: list, limit: int) -> Optional[str]:
+    """Trim the look-ahead row and return the cursor for the following page"""
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor(rows[-1].created_at, rows[-1].id)
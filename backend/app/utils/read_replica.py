@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from app.utils.cache import TTLCache
+from app.utils.database import (
+    AsyncReadSessionLocal, AsyncSessionLocal, PrimarySession, read_async_engine
+)
+
+logger = logging.getLogger("read_replica")
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_CHECK_TIMEOUT = float(os.getenv("REPLICA_CHECK_TIMEOUT", "2"))
+# How long a caller's reads stay on the primary after they write; keep it above the lag cutoff
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+
+# Echoed back by clients so the window holds whichever worker serves their next request
+LAST_WRITE_HEADER = "X-Last-Write"
+
+# 0 on a primary or a caught-up standby, else seconds since the last replayed transaction
+_POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class ReplicaState:
+    """Health of the read replica as last checked, and how reads were routed"""
+
+    def __init__(self):
+        # Unused until the first check succeeds
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks = 0
+        # bearer token -> True while its read-your-writes window is open in this worker
+        self.recent_writers = TTLCache(maxsize=100000, ttl=READ_YOUR_WRITES_SECONDS)
+
+    def mark_down(self, error: BaseException) -> None:
+        if self.healthy:
+            logger.warning("Read replica unavailable, reading from the primary: %r", error)
+        self.healthy = False
+        self.last_error = repr(error)
+
+    def stats(self) -> dict:
+        return {
+            "configured": read_async_engine is not None,
+            "healthy": self.healthy,
+            "lag_s": self.lag,
+            "max_lag_s": REPLICA_MAX_LAG_SECONDS,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "fallbacks": self.fallbacks
+        }
+
+replica = ReplicaState()
+
+# Set per request by ReadYourWritesMiddleware; [committed] once a primary session commits
+_request_writes: ContextVar[Optional[list]] = ContextVar("request_writes", default=None)
+
+@event.listens_for(PrimarySession, "after_commit")
+def _record_commit(session) -> None:
+    writes = _request_writes.get()
+    if writes is not None:
+        writes[0] = True
+
+def _bearer_token(authorization: str) -> Optional[str]:
+    scheme, _, token = authorization.partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+def wrote_recently(request: Request) -> bool:
+    """Whether this caller committed a write within READ_YOUR_WRITES_SECONDS"""
+    last_write = request.headers.get(LAST_WRITE_HEADER)
+    if last_write:
+        try:
+            if time.time() - float(last_write) < READ_YOUR_WRITES_SECONDS:
+                return True
+        except ValueError:
+            pass
+    token = _bearer_token(request.headers.get("authorization", ""))
+    return token is not None and replica.recent_writers.get(token) is not None
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only routes: the replica when it is healthy and the
+    caller has not written recently, otherwise the primary. A replica that
+    cannot be reached is marked down and the request falls back.
+    """
+    if AsyncReadSessionLocal is not None and replica.healthy and not wrote_recently(request):
+        db = AsyncReadSessionLocal()
+        try:
+            # Check out the connection now so a dead replica is caught before the route runs
+            await db.connection()
+        except (OSError, DBAPIError, asyncio.TimeoutError) as error:
+            await db.close()
+            replica.mark_down(error)
+            replica.fallbacks += 1
+        else:
+            replica.replica_reads += 1
+            try:
+                yield db
+            finally:
+                await db.close()
+            return
+    replica.primary_reads += 1
+    async with AsyncSessionLocal() as db:
+        yield db
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware that opens a caller's read-your-writes window when the
+    request commits on the primary: in this worker, keyed by bearer token,
+    and in the response's X-Last-Write header for clients to send back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = [False]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and writes[0]:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (LAST_WRITE_HEADER.lower().encode(), f"{time.time():.3f}".encode())
+                ]
+                authorization = next((value for key, value in scope["headers"] if key == b"authorization"), b"")
+                token = _bearer_token(authorization.decode("latin-1"))
+                if token is not None:
+                    replica.recent_writers.set(token, True)
+            await send(message)
+
+        context_token = _request_writes.set(writes)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writes.reset(context_token)
+
+async def _replica_lag() -> float:
+    async with read_async_engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            return float(await conn.scalar(_POSTGRES_LAG_SQL))
+        await conn.execute(text("SELECT 1"))
+        return 0.0
+
+async def check_replica() -> bool:
+    """Measure replication lag and update the replica's health"""
+    try:
+        lag = await asyncio.wait_for(_replica_lag(), REPLICA_CHECK_TIMEOUT)
+    except asyncio.CancelledError:
+        raise
+    except Exception as error:
+        replica.mark_down(error)
+        replica.lag = None
+        return False
+    replica.lag = lag
+    if lag > REPLICA_MAX_LAG_SECONDS:
+        if replica.healthy:
+            logger.warning("Read replica is %.1fs behind, reading from the primary", lag)
+        replica.healthy = False
+        replica.last_error = f"lag {lag:.1f}s"
+    else:
+        if not replica.healthy:
+            logger.info("Read replica available (lag %.1fs)", lag)
+        replica.healthy = True
+    return replica.healthy
+
+async def run_replica_monitor(interval: float = REPLICA_CHECK_INTERVAL) -> None:
+    while True:
+        await check_replica()
+        await asyncio.sleep(interval)
+
+def start_replica_monitor() -> Optional[asyncio.Task]:
+    if read_async_engine is None:
+        return None
+    return asyncio.create_task(run_replica_monitor())
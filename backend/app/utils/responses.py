@@ -0,0 +1,28 @@
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+class PydanticJSONResponse(ORJSONResponse):
+    """
+    Default response class. Dicts and lists go through orjson; a Pydantic
+    model is written straight to JSON bytes by its compiled core serializer.
+    """
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return super().render(content)
+
+def model_response(model: BaseModel, response: Optional[Response] = None) -> PydanticJSONResponse:
+    """
+    Return a model without FastAPI's response_model round trip (re-validate,
+    dump to dicts, encode). Only for models built to the declared
+    response_model. Headers set on the injected response are carried over,
+    since FastAPI does not merge them into a returned Response.
+    """
+    result = PydanticJSONResponse(model)
+    if response is not None:
+        result.raw_headers.extend(
+            (key, value) for key, value in response.raw_headers if key != b"content-length"
+        )
+    return result
@@ -0,0 +1,121 @@
+"""
+Nightly credit-limit rescoring over a large user base.
+
+Seeds N borrowers with three loans each: two repaid after between 1 and
+45 days, and a third that is repaid, open, overdue or defaulted. Runs
+rescore-limits and reports users scored per second, how long the NumPy
+scoring itself took, and the distribution of new limits. A second run
+must change nothing. The target database is dropped and recreated.
+
+    python benchmarks/credit_scoring.py --users 1000000 --database-url postgresql://localhost/microloan_bench
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+LAST_LOAN_STATUSES = ("repaid", "approved", "overdue", "defaulted")
+
+
+def seed(users: int) -> None:
+    from sqlalchemy import text
+    from app.models import loan, portfolio, transaction, user, webhook_event  # noqa: F401 - register tables
+    from app.utils.database import Base, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    if engine.dialect.name == "postgresql":
+        series = "SELECT generate_series(1, :users) AS n"
+        days_ago = "now() - make_interval(days => {})"
+        days_after = "created_at + make_interval(days => {})"
+    else:
+        series = "WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s WHERE n < :users) SELECT n FROM s"
+        days_ago = "datetime('now', '-' || ({}) || ' days')"
+        days_after = "datetime(created_at, '+' || ({}) || ' days')"
+    last_status = "CASE n % 4 " + " ".join(f"WHEN {i} THEN '{status}'" for i, status in enumerate(LAST_LOAN_STATUSES)) + " END"
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (phone, id_number, password_hash, loan_limit) "
+            f"SELECT 'C' || n, 'SCORE' || n, 'x', 5000 FROM ({series}) AS series"
+        ), {"users": users})
+        for age, status in ((200, "'repaid'"), (120, "'repaid'"), (60, last_status)):
+            conn.execute(text(
+                "INSERT INTO loans (user_id, amount, fee, total, duration, interest_rate, status, created_at) "
+                f"SELECT n, CASE WHEN n % 3 = 0 THEN 10000 ELSE 5000 END, 350, 5350, 30, 0.03, {status}, "
+                f"{days_ago.format(age)} FROM ({series}) AS series"
+            ), {"users": users})
+        # Repayment time: 1 to 45 days after the loan was taken
+        conn.execute(text(
+            f"UPDATE loans SET updated_at = {days_after.format('1 + (id * 7) % 45')} WHERE status = 'repaid'"
+        ))
+    if engine.dialect.name == "postgresql":
+        # Autovacuum would have done this on a live table
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE users, loans"))
+    engine.dispose()
+
+
+async def run(args) -> int:
+    from sqlalchemy import func, select
+    from app.models.user import User
+    from app.services import credit_scoring
+    from app.utils.database import AsyncSessionLocal, async_engine
+
+    scoring_time = 0.0
+    score_limits = credit_scoring.score_limits
+
+    def timed_score_limits(history):
+        nonlocal scoring_time
+        start = time.perf_counter()
+        limits = score_limits(history)
+        scoring_time += time.perf_counter() - start
+        return limits
+
+    credit_scoring.score_limits = timed_score_limits
+    first = await credit_scoring.rescore_all(batch_size=args.batch_size)
+    first_scoring_time = scoring_time
+    second = await credit_scoring.rescore_all(batch_size=args.batch_size)
+    credit_scoring.score_limits = score_limits
+
+    async with AsyncSessionLocal() as db:
+        limits = dict((await db.execute(select(User.loan_limit, func.count()).group_by(User.loan_limit))).all())
+    await async_engine.dispose()
+
+    summary = first.summary()
+    print(f"{args.users} users, batch size {args.batch_size}")
+    print(f"first:   {summary['scored']} scored ({summary['raised']} raised, {summary['lowered']} lowered) "
+          f"in {summary['elapsed_s']:.1f}s, {summary['scored'] / max(summary['elapsed_s'], 1e-9):,.0f} users/s; "
+          f"NumPy scoring {first_scoring_time * 1000:.0f} ms")
+    print(f"second:  {second.raised + second.lowered} changed in {second.elapsed:.1f}s")
+    print("limits:  " + ", ".join(f"{limit}: {count}" for limit, count in sorted(limits.items())))
+
+    failures = []
+    if first.scored != args.users:
+        failures.append(f"scored {first.scored} of {args.users} users")
+    if second.raised or second.lowered:
+        failures.append("a second run changed limits")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+def main(args) -> int:
+    os.environ["DATABASE_URL"] = args.database_url
+    start = time.perf_counter()
+    seed(args.users)
+    print(f"seeded in {time.perf_counter() - start:.1f}s")
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--database-url", default="sqlite:///./credit_scoring.db")
+    sys.exit(main(parser.parse_args()))
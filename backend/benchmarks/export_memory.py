@@ -0,0 +1,115 @@
+"""
+Memory ceiling of the streaming admin export.
+
+Seeds N transactions, starts the API under uvicorn in a subprocess and
+streams /api/admin/export/transactions to the end, discarding the body.
+The server's peak RSS (VmHWM) must stay under --max-rss-mb however many
+rows are exported. The target database is dropped and recreated; Linux
+only, since RSS is read from /proc.
+
+    python benchmarks/export_memory.py --rows 1000000 --database-url postgresql://localhost/microloan_bench
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ADMIN_PHONE = "0799000000"
+
+
+def seed(rows: int):
+    from sqlalchemy import insert, text
+    from app.models.user import User
+    from app.models.loan import Loan
+    from app.models.transaction import Transaction  # noqa: F401 - registers the table
+    from app.utils.database import Base, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        user_id = conn.scalar(insert(User).values(phone="0700000001", id_number="EXPORT1", password_hash="x").returning(User.id))
+        loan_id = conn.scalar(insert(Loan).values(user_id=user_id, amount=5000, fee=350, total=5350, status="repaid").returning(Loan.id))
+        metadata = "'{\"loan_id\": 1, \"payment_method\": \"mpesa\"}'"
+        if engine.dialect.name == "postgresql":
+            series = "SELECT generate_series(1, :rows) AS n"
+            metadata += "::json"
+        else:
+            series = "WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s WHERE n < :rows) SELECT n FROM s"
+        conn.execute(text(
+            "INSERT INTO transactions (loan_id, amount, type, reference, status, transaction_metadata, created_at) "
+            f"SELECT :loan_id, 5350, 'payment', 'EXPORT_' || n, 'success', {metadata}, CURRENT_TIMESTAMP "
+            f"FROM ({series}) AS series"
+        ), {"rows": rows, "loan_id": loan_id})
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not available")
+
+
+async def export(base_url: str, export_format: str):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        for _ in range(100):
+            try:
+                await client.get("/health")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        await client.post("/api/auth/register", json={"phone": ADMIN_PHONE, "id_number": "ADMIN", "password": "bench"})
+        response = await client.post("/api/auth/login", json={"phone": ADMIN_PHONE, "password": "bench"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        lines = 0
+        size = 0
+        started = time.perf_counter()
+        async with client.stream("GET", "/api/admin/export/transactions", params={"format": export_format}, headers=headers) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                lines += chunk.count(b"\n")
+                size += len(chunk)
+        return lines, size, time.perf_counter() - started
+
+
+def main(args):
+    os.environ["DATABASE_URL"] = args.database_url
+    print(f"seeding {args.rows} transactions...")
+    seed(args.rows)
+
+    env = dict(os.environ, ADMIN_PHONES=ADMIN_PHONE, WEBHOOK_CONSUMER_ENABLED="false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        lines, size, elapsed = asyncio.run(export(f"http://127.0.0.1:{args.port}", args.format))
+        peak = peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"rows exported: {lines - (1 if args.format == 'csv' else 0)}")
+    print(f"bytes:         {size / 1024 / 1024:.1f} MiB in {elapsed:.1f}s")
+    print(f"peak RSS:      {peak:.1f} MiB (ceiling {args.max_rss_mb} MiB)")
+    if peak > args.max_rss_mb:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--max-rss-mb", type=float, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", default="sqlite:///./export_bench.db")
+    main(parser.parse_args())
@@ -0,0 +1,236 @@
+"""
+End-to-end load test of one API worker.
+
+Boots the app under uvicorn (one worker) against SQLite or Postgres with
+the Paystack stub standing in for api.paystack.co, then runs --users
+concurrent borrowers for --duration seconds. Each borrower repeats the
+journey register -> login -> preview -> apply -> initialize -> (signed
+webhook or verify) -> history with a fresh account. Reports throughput
+and p50/p95/p99 per endpoint and writes the results, tagged with the git
+commit, as JSON. Pass an earlier results file to --compare to print the
+change per endpoint. The target database is dropped and recreated.
+
+    python benchmarks/loadtest.py --users 50 --duration 60 --database-url postgresql://localhost/microloan_bench
+    python benchmarks/loadtest.py --users 50 --duration 60 --compare benchmarks/results/loadtest-<commit>.json
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.paystack_stub import PaystackStub
+
+WEBHOOK_SECRET = "sk_test_loadtest"
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered: list, pct: float) -> float:
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def reset_database(database_url: str) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    from app.models import loan, transaction, user, webhook_event, portfolio  # noqa: F401 - register tables
+    from app.utils.database import Base, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[name] += 1
+            raise
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.is_error:
+            self.errors[name] += 1
+            response.raise_for_status()
+        return response.json()
+
+
+async def journey(client, recorder: Recorder, webhook_share: float) -> None:
+    phone = f"07{uuid.uuid4().int % 10**8:08d}"
+    password = "load-test"
+    await recorder.call(client, "POST /api/auth/register", "POST", "/api/auth/register", json={
+        "phone": phone, "id_number": uuid.uuid4().hex[:12], "password": password
+    })
+    tokens = await recorder.call(client, "POST /api/auth/login", "POST", "/api/auth/login", json={
+        "phone": phone, "password": password
+    })
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    amount = random.choice((3000, 4000, 5000))
+    await recorder.call(client, "POST /api/loans/preview", "POST", "/api/loans/preview", json={"principal": amount}, headers=headers)
+    loan = await recorder.call(client, "POST /api/loans/apply", "POST", "/api/loans/apply", json={"amount": amount}, headers=headers)
+    payment = await recorder.call(
+        client, "POST /api/payments/initialize", "POST", "/api/payments/initialize", json={"loan_id": loan["id"]}, headers=headers
+    )
+
+    if random.random() < webhook_share:
+        body = json.dumps({
+            "event": "charge.success",
+            "data": {"reference": payment["reference"], "status": "success", "amount": loan["total"] * 100}
+        }).encode()
+        signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha512).hexdigest()
+        await recorder.call(client, "POST /api/payments/webhook", "POST", "/api/payments/webhook", content=body, headers={
+            "Content-Type": "application/json", "X-Paystack-Signature": signature
+        })
+    else:
+        await recorder.call(client, "GET /api/payments/verify/{reference}", "GET", f"/api/payments/verify/{payment['reference']}", headers=headers)
+
+    await recorder.call(client, "GET /api/loans/history", "GET", "/api/loans/history", headers=headers)
+
+
+async def borrower(client, recorder: Recorder, deadline: float, webhook_share: float, counts: dict) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            await journey(client, recorder, webhook_share)
+            counts["completed"] += 1
+        except Exception:
+            counts["failed"] += 1
+
+
+async def run(args) -> dict:
+    import httpx
+
+    async with PaystackStub(latency=args.paystack_latency) as stub:
+        env = dict(
+            os.environ,
+            DATABASE_URL=args.database_url,
+            PAYSTACK_BASE_URL=stub.base_url,
+            PAYSTACK_SECRET_KEY=WEBHOOK_SECRET,
+            PAYSTACK_MAX_KEEPALIVE=os.environ.get("PAYSTACK_MAX_KEEPALIVE", "20"),
+        )
+        if args.bcrypt_rounds:
+            env["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        try:
+            limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60.0) as client:
+                for _ in range(100):
+                    try:
+                        await client.get("/health")
+                        break
+                    except httpx.TransportError:
+                        await asyncio.sleep(0.1)
+
+                recorder = Recorder()
+                counts = {"completed": 0, "failed": 0}
+                start = time.perf_counter()
+                await asyncio.gather(*[
+                    borrower(client, recorder, start + args.duration, args.webhook_share, counts)
+                    for _ in range(args.users)
+                ])
+                elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        endpoints[name] = {
+            "requests": len(ordered),
+            "errors": recorder.errors.get(name, 0),
+            "throughput": len(ordered) / elapsed,
+            **{f"p{pct}_ms": percentile(ordered, pct) * 1000 for pct in PERCENTILES},
+        }
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "users": args.users,
+            "duration": args.duration,
+            "database": args.database_url.split(":", 1)[0],
+            "webhook_share": args.webhook_share,
+            "paystack_latency": args.paystack_latency,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "elapsed": elapsed,
+        "journeys": counts,
+        "journeys_per_second": counts["completed"] / elapsed,
+        "requests_per_second": sum(len(latencies) for latencies in recorder.latencies.values()) / elapsed,
+        "endpoints": endpoints,
+    }
+
+
+def report(results: dict, baseline: dict = None) -> None:
+    print(f"commit {results['commit']}: {results['config']['users']} users for {results['elapsed']:.0f}s "
+          f"on {results['config']['database']}")
+    print(f"journeys: {results['journeys']['completed']} completed, {results['journeys']['failed']} failed "
+          f"({results['journeys_per_second']:.1f}/s), {results['requests_per_second']:.1f} req/s")
+    header = f"  {'endpoint':<38} {'req':>6} {'err':>4} {'req/s':>7}" + "".join(f" {f'p{pct}':>8}" for pct in PERCENTILES)
+    print(header + ("   p95 vs baseline" if baseline else ""))
+    for name, stats in results["endpoints"].items():
+        line = f"  {name:<38} {stats['requests']:>6} {stats['errors']:>4} {stats['throughput']:>7.1f}"
+        line += "".join(f" {stats[f'p{pct}_ms']:>6.1f}ms" for pct in PERCENTILES)
+        previous = (baseline or {}).get("endpoints", {}).get(name)
+        if previous:
+            line += f"   {(stats['p95_ms'] - previous['p95_ms']) / previous['p95_ms']:+.1%} (was {previous['p95_ms']:.1f}ms)"
+        print(line)
+
+
+def main(args):
+    reset_database(args.database_url)
+    results = asyncio.run(run(args))
+
+    output = args.output or os.path.join(BACKEND_DIR, "benchmarks", "results", f"loadtest-{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump(results, handle, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+    report(results, baseline)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent borrowers")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--webhook-share", type=float, default=0.5, help="fraction of payments settled by webhook rather than verify")
+    parser.add_argument("--paystack-latency", type=float, default=0.05, help="seconds the stub waits before answering")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="override BCRYPT_ROUNDS for the server")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--database-url", default="sqlite:///./loadtest.db")
+    parser.add_argument("--output", help="results file (default benchmarks/results/loadtest-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    main(parser.parse_args())
@@ -0,0 +1,68 @@
+"""
+p99 latency of GET /api/loans/history under concurrent load.
+
+Run against a server started from each commit you want to compare, e.g.
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/loan_history_latency.py --base-url http://localhost:8000 --clients 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    phone = f"07{uuid.uuid4().int % 10**8:08d}"
+    password = "bench-password"
+    response = await client.post("/api/auth/register", json={
+        "phone": phone,
+        "id_number": uuid.uuid4().hex[:12],
+        "password": password
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_client(client: httpx.AsyncClient, token: str, requests: int, latencies: list):
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get("/api/loans/history", headers=headers)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60.0) as client:
+        token = await login(client)
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            run_client(client, token, args.requests, latencies) for _ in range(args.clients)
+        ])
+        elapsed = time.perf_counter() - start
+
+    print(f"requests:   {len(latencies)}")
+    print(f"throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"mean:       {statistics.mean(latencies) * 1000:.1f} ms")
+    for pct in (50, 95, 99):
+        print(f"p{pct}:        {percentile(latencies, pct) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    asyncio.run(main(parser.parse_args()))
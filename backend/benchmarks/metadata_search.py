@@ -0,0 +1,148 @@
+"""
+Transaction metadata migration and search over a large transactions table.
+
+Migrates a fresh database to revision 005, seeds N transactions with
+metadata in the legacy double-encoded text form (one in ten paid by card,
+a few with none) and times a phone search by pattern match on the text,
+the only option before. Then times the upgrade to 006, which backfills in
+batches, checks that every row now holds a plain object with nothing lost,
+and times the admin search filters by phone and by channel with their
+plans. The target database is dropped and recreated.
+
+    python benchmarks/metadata_search.py --transactions 2000000 --database-url postgresql://localhost/microloan_bench
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TRANSACTIONS_PER_USER = 5
+
+
+def migrate(revision: str) -> float:
+    # The CLI, as in deployment; backend/alembic would shadow the package for an import here
+    start = time.perf_counter()
+    subprocess.run(["alembic", "upgrade", revision], cwd=BACKEND_DIR, check=True)
+    return time.perf_counter() - start
+
+
+def seed(conn, transactions: int) -> None:
+    from sqlalchemy import text
+
+    users = max(transactions // TRANSACTIONS_PER_USER, 1)
+    series = "SELECT generate_series(1, :count) AS n"
+    # What json.dumps() through the JSON column left in the varchar: a JSON string holding the object
+    legacy = "to_jsonb(json_build_object('loan_id', {loan}, 'user_phone', {phone}, 'payment_method', {method})::text)::text"
+    phone = "'07' || lpad(({})::text, 8, '0')"
+    conn.execute(text(
+        f"INSERT INTO users (id, phone, password_hash, loan_limit) "
+        f"SELECT n, {phone.format('n')}, 'x', 5000 FROM ({series}) s"
+    ), {"count": users})
+    conn.execute(text(
+        f"INSERT INTO loans (id, user_id, amount, fee, total, status) "
+        f"SELECT n, n, 5000, 350, 5350, 'repaid' FROM ({series}) s"
+    ), {"count": users})
+    owner = f"(n % {users}) + 1"
+    metadata = legacy.format(
+        loan=owner, phone=phone.format(owner),
+        method="CASE WHEN n % 10 = 0 THEN 'card' ELSE 'mpesa' END"
+    )
+    conn.execute(text(
+        f"INSERT INTO transactions (id, loan_id, amount, reference, status, transaction_metadata) "
+        f"SELECT n, {owner}, 5350, 'LOAN_' || n, 'success', "
+        f"CASE WHEN n % 1000 = 0 THEN NULL ELSE {metadata} END FROM ({series}) s"
+    ), {"count": transactions})
+    conn.execute(text("SELECT setval(pg_get_serial_sequence('transactions', 'id'), :count)"), {"count": transactions})
+
+
+def timed(db, query, repeat: int = 5) -> tuple[float, int]:
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(db.execute(query).all())
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def main(args):
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import func, select, text
+    from sqlalchemy.orm import Session
+    from app.utils.database import engine
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("The migrations need PostgreSQL")
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+
+    migrate("005")
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        seed(conn, args.transactions)
+        conn.execute(text("ANALYZE transactions"))
+    print(f"seeded {args.transactions} transactions in {time.perf_counter() - start:.1f}s")
+
+    phone = "0700000123"
+    with Session(engine) as db:
+        legacy_ms, legacy_rows = timed(db, text(
+            "SELECT id FROM transactions WHERE transaction_metadata LIKE :pattern ORDER BY created_at DESC, id DESC LIMIT 51"
+        ).bindparams(pattern=f"%{phone}%"), repeat=3)
+    print(f"before: phone search by pattern {legacy_ms:.1f} ms ({legacy_rows} rows)")
+
+    print(f"upgrade 005 -> 006 (batched backfill): {migrate('006'):.1f}s")
+
+    from app.models.transaction import Transaction
+    from app.routers.admin import _metadata_contains
+    from app.utils.pagination import keyset_page
+
+    failures = []
+    with Session(engine) as db:
+        with_metadata = db.scalar(select(func.count()).where(Transaction.transaction_metadata.is_not(None)))
+        expected = args.transactions - args.transactions // 1000
+        if with_metadata != expected:
+            failures.append(f"{with_metadata} rows with metadata, expected {expected}")
+        not_objects = db.scalar(text(
+            "SELECT count(*) FROM transactions WHERE transaction_metadata IS NOT NULL AND jsonb_typeof(transaction_metadata) <> 'object'"
+        ))
+        if not_objects:
+            failures.append(f"{not_objects} rows still hold a string")
+        sample = db.scalar(select(Transaction.transaction_metadata).where(Transaction.id == 1))
+        if not isinstance(sample, dict) or sample.get("payment_method") != "mpesa":
+            failures.append(f"unexpected metadata {sample!r}")
+
+        for label, criteria in (
+            ("phone", {"user_phone": phone}),
+            ("channel", {"payment_method": "card"}),
+            ("phone and channel", {"user_phone": phone, "payment_method": "mpesa"})
+        ):
+            # Only columns the migrations create
+            query = keyset_page(select(Transaction.id, Transaction.created_at).where(_metadata_contains(db, criteria)), Transaction.created_at, Transaction.id, None, 50)
+            elapsed, rows = timed(db, query)
+            print(f"after:  search by {label} {elapsed:.1f} ms ({rows} rows)")
+            if label == "phone" and rows != legacy_rows:
+                failures.append(f"phone search found {rows} rows, the pattern search {legacy_rows}")
+            compiled = query.compile(engine)
+            params = {key: json.dumps(value) if isinstance(value, dict) else value for key, value in compiled.params.items()}
+            plan = db.connection().exec_driver_sql("EXPLAIN " + str(compiled), params).scalars().all()
+            print("\n".join("        " + line for line in plan))
+
+    engine.dispose()
+    for failure in failures:
+        print("FAIL  " + failure)
+    if failures:
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--database-url", default="postgresql://localhost/microloan_bench")
+    main(parser.parse_args())
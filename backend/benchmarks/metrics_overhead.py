@@ -0,0 +1,92 @@
+"""
+Per-request cost of the /metrics instrumentation.
+
+Runs the app in-process (ASGI transport, no network) in child processes
+with METRICS_ENABLED=false and =true, alternating several rounds, and
+compares median latency of a DB-backed route and a CPU-only route. The
+difference is the cost of the middleware, the SQL event hooks and the
+histogram updates. The target database is dropped and recreated.
+
+    python benchmarks/metrics_overhead.py --requests 2000 --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROUTES = {
+    "GET /api/loans/history": ("GET", "/api/loans/history", None),
+    "POST /api/loans/preview": ("POST", "/api/loans/preview", {"principal": 5000}),
+}
+
+
+async def child(args):
+    import httpx
+    from app.main import app
+    from app.utils.database import Base, async_engine, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/auth/register", json={"phone": "0711000000", "id_number": "BENCH", "password": "bench"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await client.post("/api/loans/apply", json={"amount": 5000}, headers=headers)
+        for name, (method, path, body) in ROUTES.items():
+            for _ in range(args.requests // 10):
+                await client.request(method, path, json=body, headers=headers)
+            latencies = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+            results[name] = statistics.median(latencies)
+    await async_engine.dispose()
+    print(json.dumps(results))
+
+
+def main(args):
+    medians = {True: {name: [] for name in ROUTES}, False: {name: [] for name in ROUTES}}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            env = dict(
+                os.environ,
+                METRICS_ENABLED=str(enabled).lower(),
+                DATABASE_URL=args.database_url,
+                WEBHOOK_CONSUMER_ENABLED="false",
+                BCRYPT_ROUNDS="4",
+            )
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", "--requests", str(args.requests)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            for name, median in json.loads(output.strip().splitlines()[-1]).items():
+                medians[enabled][name].append(median)
+
+    print(f"{args.requests} sequential requests per route, {args.rounds} rounds, median of round medians")
+    for name in ROUTES:
+        off = statistics.median(medians[False][name])
+        on = statistics.median(medians[True][name])
+        print(f"  {name:<24} off {off * 1e6:7.0f} us   on {on * 1e6:7.0f} us   "
+              f"overhead {(on - off) * 1e6:+5.0f} us ({(on - off) / off:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--database-url", default="sqlite:///./metrics_bench.db")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.child:
+        asyncio.run(child(parsed))
+    else:
+        main(parsed)
@@ -0,0 +1,135 @@
+"""
+Micro-benchmarks for helpers on the request path.
+
+Each case is timed with timeit: the loop count is auto-ranged to about
+0.2 s, then repeated --repeat times. The median per-call time is the
+figure of record, and the IQR shows how noisy the run was. --save writes
+the results as a baseline. --compare checks a run against a baseline and
+exits 1 when a case's median and best run are both slower by more than
+--threshold.
+
+    python benchmarks/micro.py --save benchmarks/results/micro-baseline.json
+    python benchmarks/micro.py --compare benchmarks/results/micro-baseline.json --threshold 0.10
+    python benchmarks/micro.py --filter jwt
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_cases() -> dict:
+    """name -> zero-argument callable; setup happens here, outside the timed loop"""
+    from app.models.user import User
+    from app.routers.loan import calculate_fee
+    from app.schemas.user import UserResponse
+    from app.services.paystack_service import PaystackService
+    from app.utils.auth import _decode_access_token, create_access_token, decode_token, token_cache
+
+    principals = [3000, 5000, 6500, 10000, 25000, 60000] * 10
+    token = create_access_token({"sub": "0700000001"})
+    _decode_access_token(token)
+    paystack = PaystackService()
+    paystack.secret_key = "sk_test_micro"
+    webhook_body = json.dumps({
+        "event": "charge.success",
+        "data": {"reference": "LOAN_1_ABCDEF12", "status": "success", "amount": 535000, "metadata": {"loan_id": 1}}
+    }).encode().ljust(1024)
+    signature = hmac.new(b"sk_test_micro", webhook_body, hashlib.sha512).hexdigest()
+    user = User(
+        id=1, phone="0700000001", id_number="12345678", password_hash="x",
+        loan_limit=5000, created_at=datetime.now(timezone.utc)
+    )
+
+    def decode_uncached():
+        token_cache.pop(token)
+        return _decode_access_token(token)
+
+    return {
+        # 60 principals per call
+        "calculate_fee[x60]": lambda: [calculate_fee(principal) for principal in principals],
+        "jwt.create_access_token": lambda: create_access_token({"sub": "0700000001"}),
+        "jwt.decode_token": lambda: decode_token(token),
+        "jwt.get_current_user_decode[cache hit]": lambda: _decode_access_token(token),
+        "jwt.get_current_user_decode[cache miss]": decode_uncached,
+        "paystack.verify_webhook_signature[1KiB]": lambda: paystack.verify_webhook_signature(webhook_body, signature),
+        "UserResponse.model_validate[orm]": lambda: UserResponse.model_validate(user),
+    }
+
+
+def measure(function, repeat: int) -> dict:
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number = max(1, number)
+    samples = sorted(total / number for total in timer.repeat(repeat=repeat, number=number))
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    return {
+        "median_us": statistics.median(samples) * 1e6,
+        "min_us": samples[0] * 1e6,
+        "iqr_us": (quartiles[2] - quartiles[0]) * 1e6,
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def main(args) -> int:
+    cases = build_cases()
+    if args.filter:
+        cases = {name: function for name, function in cases.items() if args.filter in name}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)["cases"]
+
+    results = {}
+    regressions = []
+    print(f"{'case':<42} {'median':>10} {'iqr':>9}" + ("   vs baseline" if baseline else ""))
+    for name, function in cases.items():
+        stats = results[name] = measure(function, args.repeat)
+        line = f"{name:<42} {stats['median_us']:>8.2f}us {stats['iqr_us']:>7.2f}us"
+        previous = (baseline or {}).get(name)
+        if previous:
+            change = stats["median_us"] / previous["median_us"] - 1
+            # Both the median and the best run must be slower, so one noisy burst is not a regression
+            best_change = stats["min_us"] / previous["min_us"] - 1
+            flag = ""
+            if change > args.threshold and best_change > args.threshold:
+                flag = "  REGRESSION"
+                regressions.append(name)
+            line += f"   {change:+7.1%} (was {previous['median_us']:.2f}us){flag}"
+        print(line)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as handle:
+            json.dump({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cases": results,
+            }, handle, indent=2)
+        print(f"baseline written to {args.save}")
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--save", help="write results as a baseline file")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown of the median, e.g. 0.10 for 10%%")
+    sys.exit(main(parser.parse_args()))
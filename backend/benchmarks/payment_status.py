@@ -0,0 +1,252 @@
+"""
+Pushed payment status across workers with thousands of idle waiters.
+
+Seeds N borrowers, each with a loan and a pending payment, and boots two
+uvicorn processes standing in for two workers. Every borrower waits on
+their payment's status, alternating between the SSE stream and the long
+poll and between the two workers. Once all are waiting, a third process
+settles the payments in webhook-sized batches. Reports
+the memory each worker spent per idle waiter, the connections checked out
+while waiting, the worker CPU per status delivered and the time from each
+batch's commit until its waiters heard (on few cores, mostly queueing
+behind the other processes), and checks every waiter saw "success". Needs PostgreSQL; the
+target database is dropped and recreated.
+
+    python benchmarks/payment_status.py --waiters 4000 --database-url postgresql://localhost/microloan_bench
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.loadtest import percentile, reset_database
+
+SECRET_KEY = "payment-status-benchmark-secret-key-0123456789"
+PERCENTILES = (50, 95, 99)
+
+
+def seed(waiters: int) -> list[tuple[str, str]]:
+    """(reference, access token) per borrower"""
+    from sqlalchemy import text
+    from app.utils.auth import create_access_token
+    from app.utils.database import engine
+
+    series = "SELECT generate_series(1, :count) AS n"
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"INSERT INTO users (id, phone, id_number, password_hash, loan_limit) "
+            f"SELECT n, '07' || lpad(n::text, 8, '0'), 'ID' || n, 'x', 5000 FROM ({series}) s"
+        ), {"count": waiters})
+        conn.execute(text(
+            f"INSERT INTO loans (id, user_id, amount, fee, total, duration, status) "
+            f"SELECT n, n, 5000, 350, 5350, 30, 'approved' FROM ({series}) s"
+        ), {"count": waiters})
+        conn.execute(text(
+            f"INSERT INTO transactions (loan_id, amount, type, reference, status) "
+            f"SELECT n, 5350, 'payment', 'LOAN_' || n || '_BENCH', 'pending' FROM ({series}) s"
+        ), {"count": waiters})
+    engine.dispose()
+    return [
+        (f"LOAN_{n}_BENCH", create_access_token({"sub": f"07{n:08d}"}))
+        for n in range(1, waiters + 1)
+    ]
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        return int(re.search(r"VmRSS:\s+(\d+)", status.read()).group(1)) / 1024
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def gauge(client, name: str) -> float:
+    metrics = (await client.get("/metrics")).text
+    match = re.search(rf"^{name} (\S+)$", metrics, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+async def request_status(port: int, reference: str, token: str, stream: bool) -> str:
+    """
+    One status request on its own connection, read by hand: httpx's pool
+    slows down with thousands of connections open at once
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        accept = "text/event-stream" if stream else "application/json"
+        writer.write((
+            f"GET /api/payments/status/{reference} HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+            f"Authorization: Bearer {token}\r\nAccept: {accept}\r\nConnection: close\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        if b" 200 " not in status_line:
+            raise RuntimeError(status_line.decode().strip())
+        while (await reader.readline()).strip():
+            pass
+        if not stream:
+            return json.loads((await reader.read()).split(b"\r\n")[-1] or b"{}")["status"]
+        status = "pending"
+        while status == "pending":
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"data: "):
+                status = json.loads(line[6:])["status"]
+        return status
+    finally:
+        writer.close()
+
+
+async def wait_sse(port: int, reference: str, token: str, heard: dict, delay: float) -> None:
+    await asyncio.sleep(delay)
+    status = await request_status(port, reference, token, stream=True)
+    heard[reference] = (status, time.time())
+
+
+async def wait_long_poll(port: int, reference: str, token: str, heard: dict, delay: float) -> None:
+    await asyncio.sleep(delay)
+    while (status := await request_status(port, reference, token, stream=False)) == "pending":
+        pass
+    heard[reference] = (status, time.time())
+
+
+async def settle(references: list[str], batch_size: int) -> dict:
+    """Settle in batches as the webhook consumer would; commit time per reference"""
+    from app.services.settlement import settle_references
+    from app.utils.database import AsyncSessionLocal, async_engine
+
+    committed = {}
+    for start in range(0, len(references), batch_size):
+        batch = references[start:start + batch_size]
+        async with AsyncSessionLocal() as db:
+            await settle_references(db, batch)
+            await db.commit()
+        now = time.time()
+        committed.update((reference, now) for reference in batch)
+    await async_engine.dispose()
+    return committed
+
+
+def settle_in_process(database_url: str, references: list[str], batch_size: int) -> dict:
+    # Its own process, so the clients' event loop neither delays nor times the commits
+    os.environ["DATABASE_URL"] = database_url
+    return asyncio.run(settle(references, batch_size))
+
+
+async def run(args) -> int:
+    import httpx
+
+    borrowers = seed(args.waiters)
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url,
+        SECRET_KEY=SECRET_KEY,
+        WEBHOOK_CONSUMER_ENABLED="false",
+        PAYMENT_STATUS_WAIT_SECONDS="60",
+    )
+    ports = [args.port, args.port + 1]
+    servers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        for port in ports
+    ]
+    failures = []
+    try:
+        clients = [httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") for port in ports]
+        for client in clients:
+            for _ in range(100):
+                try:
+                    await client.get("/health")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+        while not all([await gauge(client, "payment_status_listening") for client in clients]):
+            await asyncio.sleep(0.1)
+        idle_rss = [rss_mb(server.pid) for server in servers]
+
+        heard = {}
+        tasks = []
+        for index, (reference, token) in enumerate(borrowers):
+            wait = wait_sse if index % 2 == 0 else wait_long_poll
+            # Borrowers arrive over time, not all in the same instant
+            delay = index / args.arrival_rate
+            tasks.append(asyncio.create_task(wait(ports[index // 2 % 2], reference, token, heard, delay)))
+        start = time.perf_counter()
+        while sum([await gauge(client, "payment_status_waiters") for client in clients]) < args.waiters:
+            if time.perf_counter() - start > 120 + args.waiters / args.arrival_rate:
+                raise SystemExit("waiters did not all connect")
+            await asyncio.sleep(0.2)
+        print(f"{args.waiters} waiters connected in {time.perf_counter() - start:.1f}s at {args.arrival_rate:.0f}/s")
+        await asyncio.sleep(1)
+        for port, server, before in zip(ports, servers, idle_rss):
+            after = rss_mb(server.pid)
+            print(f"worker :{port}: RSS {before:.0f} -> {after:.0f} MB ({(after - before) * 1024 / (args.waiters / 2):.1f} KB per waiter)")
+        checked_out = sum([await gauge(client, "db_pool_checked_out") for client in clients])
+        print(f"database connections checked out while waiting: {checked_out:.0f}")
+        if checked_out:
+            failures.append("waiters are holding database connections")
+
+        cpu_before = [cpu_seconds(server.pid) for server in servers]
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            committed = await asyncio.get_running_loop().run_in_executor(
+                pool, settle_in_process, args.database_url, [reference for reference, _ in borrowers], args.batch_size
+            )
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=60)
+        for port, server, before in zip(ports, servers, cpu_before):
+            used = cpu_seconds(server.pid) - before
+            print(f"worker :{port}: {used * 1000 / (args.waiters / 2):.2f} ms CPU per status delivered")
+        for client in clients:
+            await client.aclose()
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+    latencies = sorted(heard[reference][1] - committed[reference] for reference in committed if reference in heard)
+    wrong = [reference for reference, (status, _) in heard.items() if status != "success"]
+    print(f"settled {len(committed)} in batches of {args.batch_size}; {len(heard)} waiters heard")
+    print("commit -> client: " + ", ".join(f"p{pct} {percentile(latencies, pct) * 1000:.1f} ms" for pct in PERCENTILES)
+          + f", max {latencies[-1] * 1000:.1f} ms")
+    if len(heard) != args.waiters:
+        failures.append(f"{args.waiters - len(heard)} waiters never heard")
+    if wrong:
+        failures.append(f"{len(wrong)} waiters heard something other than success")
+    for failure in failures:
+        print("FAIL  " + failure)
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+def main(args):
+    if not args.database_url.startswith("postgresql"):
+        raise SystemExit("LISTEN/NOTIFY needs PostgreSQL")
+    os.environ["SECRET_KEY"] = SECRET_KEY
+    reset_database(args.database_url)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--waiters", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--arrival-rate", type=float, default=100, help="new waiters per second")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", default="postgresql://localhost/microloan_bench")
+    main(parser.parse_args())
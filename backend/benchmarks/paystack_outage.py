@@ -0,0 +1,131 @@
+"""
+Paystack outage drill for the circuit breaker and deadlines.
+
+Drives verify calls through PaystackService against the local stub while
+it goes through three phases: healthy, hanging (responses slower than the
+deadline) or erroring (--outage 5xx), and recovered. Checks that:
+- during the outage no call outlives the deadline
+- the breaker opens and later calls are rejected immediately
+- POST /api/payments/initialize answers 503 with Retry-After while open
+- after the open period, half-open probes close the breaker again
+The target database is dropped and recreated.
+
+    python benchmarks/paystack_outage.py --outage hang
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.paystack_stub import PaystackStub
+
+
+async def timed_verify(paystack_service, reference: str):
+    from app.utils.circuit_breaker import CircuitOpenError
+
+    start = time.perf_counter()
+    try:
+        result = await paystack_service.verify_transaction(reference)
+        outcome = result.get("status")
+    except CircuitOpenError:
+        outcome = "rejected"
+    return outcome, time.perf_counter() - start
+
+
+async def main(args) -> int:
+    async with PaystackStub() as stub:
+        os.environ.update({
+            "DATABASE_URL": args.database_url,
+            "PAYSTACK_BASE_URL": stub.base_url,
+            "PAYSTACK_SECRET_KEY": "sk_test_stub",
+            "PAYSTACK_DEADLINE": str(args.deadline),
+            "PAYSTACK_BREAKER_OPEN_SECONDS": str(args.open_seconds),
+            "PAYSTACK_BREAKER_MIN_CALLS": "10",
+            "WEBHOOK_CONSUMER_ENABLED": "false",
+            "BCRYPT_ROUNDS": "4",
+        })
+
+        import httpx
+        from app.main import app
+        from app.services.paystack_service import paystack_service
+        from app.utils.database import Base, async_engine, engine
+
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        failures = []
+
+        # Healthy
+        results = await asyncio.gather(*[timed_verify(paystack_service, f"OK_{i}") for i in range(args.calls)])
+        print(f"healthy:   {sum(outcome == 'success' for outcome, _ in results)}/{args.calls} verified, "
+              f"breaker {paystack_service.breaker.state}")
+
+        # Outage
+        if args.outage == "hang":
+            stub.latency = args.deadline * 3
+        else:
+            stub.error_status = 503
+        start = time.perf_counter()
+        requests_before = stub.requests
+        results = []
+        for _ in range(args.waves):
+            results += await asyncio.gather(*[timed_verify(paystack_service, f"OUT_{i}") for i in range(args.calls)])
+        outage_elapsed = time.perf_counter() - start
+        rejected = [duration for outcome, duration in results if outcome == "rejected"]
+        attempted = [duration for outcome, duration in results if outcome != "rejected"]
+        print(f"outage:    {len(results)} calls, {stub.requests - requests_before} requests reached Paystack, "
+              f"slowest failed call {max(attempted, default=0) * 1000:.0f} ms, "
+              f"{len(rejected)} rejected by the breaker (median {statistics.median(rejected or [0]) * 1000:.2f} ms), "
+              f"{outage_elapsed:.1f}s total, breaker {paystack_service.breaker.state}")
+        if max(attempted, default=0) > args.deadline + 0.5:
+            failures.append("a call outlived the deadline")
+        if paystack_service.breaker.state != "open" or not rejected:
+            failures.append("breaker did not open")
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://drill") as client:
+            response = await client.post("/api/auth/register", json={"phone": "0700999000", "id_number": "DRILL", "password": "drill"})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            loan = (await client.post("/api/loans/apply", json={"amount": 3000}, headers=headers)).json()
+            start = time.perf_counter()
+            response = await client.post("/api/payments/initialize", json={"loan_id": loan["id"]}, headers=headers)
+            print(f"api:       initialize -> {response.status_code} Retry-After={response.headers.get('retry-after')} "
+                  f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+            if response.status_code != 503 or not response.headers.get("retry-after"):
+                failures.append("initialize did not fail fast with 503")
+            health = (await client.get("/health/paystack")).json()
+            print(f"health:    {health['breaker']}")
+
+        # Recovery
+        stub.latency = 0.0
+        stub.error_status = None
+        await asyncio.sleep(args.open_seconds + 0.1)
+        results = []
+        for _ in range(3):
+            results += await asyncio.gather(*[timed_verify(paystack_service, f"BACK_{i}") for i in range(3)])
+        print(f"recovered: {sum(outcome == 'success' for outcome, _ in results)}/{len(results)} verified, "
+              f"breaker {paystack_service.breaker.state}")
+        if paystack_service.breaker.state != "closed":
+            failures.append("breaker did not close after recovery")
+
+        await paystack_service.close()
+        await async_engine.dispose()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--outage", choices=["hang", "5xx"], default="hang")
+    parser.add_argument("--calls", type=int, default=20, help="concurrent verify calls per wave")
+    parser.add_argument("--waves", type=int, default=3)
+    parser.add_argument("--deadline", type=float, default=1.0, help="PAYSTACK_DEADLINE for the drill, seconds")
+    parser.add_argument("--open-seconds", type=float, default=2.0)
+    parser.add_argument("--database-url", default="sqlite:///./paystack_outage.db")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,130 @@
+"""
+Minimal local stand-in for api.paystack.co.
+
+Speaks just enough HTTP/1.1 (with keep-alive) to answer the endpoints
+PaystackService calls, and counts accepted TCP connections so callers can
+check connection reuse. Every transaction verifies as successful unless its
+reference is listed in ``failing_references``. Setting ``error_status``
+makes every request answer with that HTTP status instead, and ``latency``
+can be changed while the stub runs, to simulate an outage.
+"""
+import asyncio
+import json
+from typing import Optional
+
+
+class PaystackStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.failing_references: set = set()
+        self.error_status: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "PaystackStub":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "PaystackStub":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if self.error_status:
+                    status_line = f"HTTP/1.1 {self.error_status} Error\r\n".encode()
+                    payload = json.dumps({"status": False, "message": "Stub error"}).encode()
+                else:
+                    status_line = b"HTTP/1.1 200 OK\r\n"
+                    payload = json.dumps(self.respond(method, path, body)).encode()
+                writer.write(
+                    status_line +
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(payload)).encode() + b"\r\n"
+                    b"\r\n" + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, method: str, path: str, body: bytes) -> dict:
+        if method == "POST" and path == "/transaction/initialize":
+            data = json.loads(body or b"{}")
+            reference = data.get("reference", "")
+            return {
+                "status": True,
+                "message": "Authorization URL created",
+                "data": {
+                    "authorization_url": f"{self.base_url}/checkout/{reference}",
+                    "access_code": f"AC_{reference}",
+                    "reference": reference
+                }
+            }
+        if method == "GET" and path.startswith("/transaction/verify/"):
+            reference = path.rsplit("/", 1)[-1]
+            status = "failed" if reference in self.failing_references else "success"
+            return {
+                "status": True,
+                "message": "Verification successful",
+                "data": {
+                    "reference": reference,
+                    "status": status,
+                    "amount": 100000,
+                    "customer": {"customer_code": "CUS_stub"}
+                }
+            }
+        if method == "GET" and path.startswith("/transaction/"):
+            return {"status": True, "data": {"reference": path.rsplit("/", 1)[-1]}}
+        return {"status": False, "message": "Not found"}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the Paystack stub server")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    async def serve():
+        stub = await PaystackStub(port=args.port, latency=args.latency).start()
+        print(f"Paystack stub listening on {stub.base_url}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
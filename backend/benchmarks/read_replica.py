@@ -0,0 +1,112 @@
+"""
+Read-replica routing drill with two local SQLite databases.
+
+The replica is a copy of the primary file, opened read-only, and is
+"replicated" by copying the file again. Checks that:
+- a caller's reads go to the primary right after their own write, in the
+  same worker (bearer-token mark) and in another (X-Last-Write header)
+- other reads are served by the replica, stale until the next copy
+- with the replica file gone, reads fall back to the primary and succeed
+- the monitor brings the replica back once the file returns
+Both files are deleted and recreated.
+
+    python benchmarks/read_replica.py
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def replicate(primary: str, replica: str) -> None:
+    shutil.copyfile(primary, replica)
+
+
+async def main(args) -> int:
+    primary = os.path.abspath(args.primary)
+    replica_path = os.path.abspath(args.replica)
+    for path in (primary, replica_path):
+        if os.path.exists(path):
+            os.remove(path)
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{primary}",
+        "DATABASE_READ_URL": f"sqlite:///file:{replica_path}?mode=ro&uri=true",
+        "REPLICA_CHECK_INTERVAL": "0.2",
+        "WEBHOOK_CONSUMER_ENABLED": "false",
+        "BCRYPT_ROUNDS": "4",
+    })
+
+    import httpx
+    from app.main import app
+    from app.models import loan, portfolio, transaction, user, webhook_event  # noqa: F401 - register tables
+    from app.utils.database import Base, engine, read_async_engine
+    from app.utils.read_replica import replica
+
+    Base.metadata.create_all(engine)
+    failures = []
+
+    def expect(condition: bool, message: str) -> None:
+        print(("ok    " if condition else "FAIL  ") + message)
+        if not condition:
+            failures.append(message)
+
+    async def history(client, headers) -> tuple[int, str]:
+        before = replica.replica_reads
+        response = await client.get("/api/loans/history", headers=headers)
+        response.raise_for_status()
+        return len(response.json()["loans"]), "replica" if replica.replica_reads > before else "primary"
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://drill") as client:
+            response = await client.post("/api/auth/register", json={"phone": "0700111000", "id_number": "DRILL", "password": "drill"})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            replicate(primary, replica_path)
+            await asyncio.sleep(0.5)
+            expect(replica.healthy, "replica healthy after the first check")
+
+            response = await client.post("/api/loans/apply", json={"amount": 3000}, headers=headers)
+            last_write = response.headers.get("x-last-write")
+            expect(last_write is not None, "write response carries X-Last-Write")
+
+            loans, source = await history(client, headers)
+            expect((loans, source) == (1, "primary"), f"own write visible in this worker ({loans} loans from {source})")
+
+            # Another worker has no mark for this token, only the header
+            replica.recent_writers = type(replica.recent_writers)(maxsize=100000, ttl=replica.recent_writers.ttl)
+            loans, source = await history(client, {**headers, "X-Last-Write": last_write})
+            expect((loans, source) == (1, "primary"), f"own write visible in another worker ({loans} loans from {source})")
+
+            loans, source = await history(client, headers)
+            expect((loans, source) == (0, "replica"), f"later reads use the (stale) replica ({loans} loans from {source})")
+            replicate(primary, replica_path)
+            loans, source = await history(client, headers)
+            expect((loans, source) == (1, "replica"), f"replica serves the loan once replicated ({loans} loans from {source})")
+
+            os.remove(replica_path)
+            await read_async_engine.dispose()
+            loans, source = await history(client, headers)
+            expect((loans, source) == (1, "primary"), f"replica down: read falls back ({loans} loans from {source})")
+            expect(not replica.healthy and replica.fallbacks >= 1, f"replica marked down ({replica.last_error})")
+
+            replicate(primary, replica_path)
+            await asyncio.sleep(0.5)
+            loans, source = await history(client, headers)
+            expect((loans, source) == (1, "replica"), f"replica back after the monitor's next check ({loans} loans from {source})")
+
+            print((await client.get("/health/db")).json()["replica"])
+
+    for path in (primary, replica_path):
+        if os.path.exists(path):
+            os.remove(path)
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--primary", default="./replica_drill_primary.db")
+    parser.add_argument("--replica", default="./replica_drill_replica.db")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,79 @@
+"""
+Reconciliation run against the local Paystack stub.
+
+Seeds pending transactions older than the reconciliation cutoff (a
+fraction of them fail at the stub), runs reconcile_pending and prints the
+report. The target database is dropped and recreated.
+
+    python benchmarks/reconcile_stub.py --transactions 5000 --concurrency 20 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.paystack_stub import PaystackStub
+
+
+async def main(args):
+    async with PaystackStub(latency=args.latency) as stub:
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ["PAYSTACK_BASE_URL"] = stub.base_url
+        os.environ["PAYSTACK_SECRET_KEY"] = "sk_test_stub"
+        os.environ["PAYSTACK_MAX_CONNECTIONS"] = str(args.concurrency)
+        os.environ["PAYSTACK_MAX_KEEPALIVE"] = str(args.concurrency)
+
+        from sqlalchemy import insert
+        from app.models.user import User
+        from app.models.loan import Loan
+        from app.models.transaction import Transaction
+        from app.services.paystack_service import paystack_service
+        from app.services.reconciliation import reconcile_pending
+        from app.utils.database import Base, engine
+
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        created_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        count = args.transactions
+        with engine.begin() as conn:
+            conn.execute(insert(User), [
+                {"id": i, "phone": f"07{i:08d}", "id_number": f"ID{i}", "password_hash": "x", "loan_limit": 5000}
+                for i in range(1, count + 1)
+            ])
+            conn.execute(insert(Loan), [
+                {"id": i, "user_id": i, "amount": 5000, "fee": 350, "total": 5350, "status": "approved"}
+                for i in range(1, count + 1)
+            ])
+            conn.execute(insert(Transaction), [
+                {"loan_id": i, "amount": 5350, "reference": f"LOAN_{i}_RECON", "status": "pending", "created_at": created_at}
+                for i in range(1, count + 1)
+            ])
+        stub.failing_references = {
+            f"LOAN_{i}_RECON" for i in random.sample(range(1, count + 1), int(count * args.failure_rate))
+        }
+
+        await paystack_service.start()
+        report = await reconcile_pending(older_than_minutes=15, page_size=args.page_size, concurrency=args.concurrency)
+        await paystack_service.close()
+
+    print(json.dumps(report.summary(), indent=2))
+    print(f"stub connections: {stub.connections}")
+    expected_failed = len(stub.failing_references)
+    if report.settled != count - expected_failed or report.failed != expected_failed:
+        raise SystemExit("FAIL: reconciliation outcome does not match the stub")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=5000)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub response delay in seconds")
+    parser.add_argument("--database-url", default="sqlite:///./reconcile_bench.db")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""
+Response serialization cost for a 500-loan LoanListResponse.
+
+Compares FastAPI's default path (re-validate the returned model, dump it to
+Python dicts, encode with the stdlib json module), the same path encoded
+with orjson, and the direct path used by model_response (the model's core
+serializer writes JSON bytes in one pass). All three bodies must decode to
+the same document.
+
+    python benchmarks/serialization.py --loans 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_response(count: int):
+    from app.schemas.loan import LoanListResponse, LoanResponse
+
+    now = datetime.now(timezone.utc)
+    loans = [
+        LoanResponse(
+            id=index, user_id=1, amount=5000, fee=350, total=5350,
+            status="repaid" if index % 3 else "approved", created_at=now - timedelta(days=index)
+        )
+        for index in range(count, 0, -1)
+    ]
+    return LoanListResponse(loans=loans, loan_limit=7000, next_cursor="eyJpZCI6IDF9")
+
+
+def main(args):
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.schemas.loan import LoanListResponse
+    from app.utils.responses import PydanticJSONResponse
+
+    model = build_response(args.loans)
+    field = create_response_field(name="Response_get_loan_history", type_=LoanListResponse)
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path(response_class):
+        def render():
+            content = loop.run_until_complete(serialize_response(field=field, response_content=model))
+            return response_class(content).body
+        return render
+
+    paths = {
+        "fastapi default (stdlib json)": fastapi_path(JSONResponse),
+        "fastapi default + orjson": fastapi_path(ORJSONResponse),
+        "direct core serializer": lambda: PydanticJSONResponse(model).body,
+    }
+
+    bodies = {name: render() for name, render in paths.items()}
+    documents = {name: json.loads(body) for name, body in bodies.items()}
+    assert all(document == documents["fastapi default (stdlib json)"] for document in documents.values()), "bodies differ"
+
+    print(f"{args.loans} loans, {len(bodies['direct core serializer']) / 1024:.0f} KiB body, "
+          f"best of {args.repeat} x {args.number} renders")
+    baseline = None
+    for name, render in paths.items():
+        timings = [t / args.number for t in timeit.repeat(render, number=args.number, repeat=args.repeat)]
+        best = min(timings)
+        baseline = baseline or best
+        print(f"  {name:<28} {best * 1e3:7.3f} ms  (median {statistics.median(timings) * 1e3:.3f} ms)  {baseline / best:5.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=500)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=15)
+    main(parser.parse_args())
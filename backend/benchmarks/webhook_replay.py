@@ -0,0 +1,104 @@
+"""
+Replay synthetic charge.success webhooks through the inbox.
+
+Seeds one user, loan and pending transaction per event, posts the signed
+events to /api/payments/webhook in-process, then waits for the background
+consumer to drain the inbox. Reports ingest and settlement throughput.
+The target database is dropped and recreated, so point it at a scratch
+database.
+
+    python benchmarks/webhook_replay.py --events 10000 --database-url sqlite:///./webhook_bench.db
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SECRET = "sk_test_webhook_bench"
+
+
+async def main(args):
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["PAYSTACK_SECRET_KEY"] = SECRET
+    os.environ["WEBHOOK_BATCH_SIZE"] = str(args.batch_size)
+
+    import httpx
+    from sqlalchemy import func, insert, select
+    from app.main import app
+    from app.models.user import User
+    from app.models.loan import Loan
+    from app.models.transaction import Transaction
+    from app.models.webhook_event import WebhookEvent
+    from app.utils.database import AsyncSessionLocal, Base, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "phone": f"07{i:08d}", "id_number": f"ID{i}", "password_hash": "x", "loan_limit": 5000}
+            for i in range(1, args.events + 1)
+        ])
+        conn.execute(insert(Loan), [
+            {"id": i, "user_id": i, "amount": 5000, "fee": 350, "total": 5350, "status": "approved"}
+            for i in range(1, args.events + 1)
+        ])
+        conn.execute(insert(Transaction), [
+            {"loan_id": i, "amount": 5350, "reference": f"LOAN_{i}_BENCH", "status": "pending"}
+            for i in range(1, args.events + 1)
+        ])
+
+    bodies = []
+    for i in range(1, args.events + 1):
+        bodies.append(json.dumps({"event": "charge.success", "data": {"reference": f"LOAN_{i}_BENCH"}}).encode())
+    bodies += random.sample(bodies, int(len(bodies) * args.duplicates))
+    random.shuffle(bodies)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def deliver(body: bytes):
+                signature = hmac.new(SECRET.encode(), body, hashlib.sha512).hexdigest()
+                async with semaphore:
+                    response = await client.post(
+                        "/api/payments/webhook", content=body,
+                        headers={"x-paystack-signature": signature, "content-type": "application/json"}
+                    )
+                response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*[deliver(body) for body in bodies])
+            ingested = time.perf_counter() - start
+
+            async with AsyncSessionLocal() as db:
+                while await db.scalar(select(func.count()).where(WebhookEvent.processed_at.is_(None))):
+                    await asyncio.sleep(0.05)
+                drained = time.perf_counter() - start
+                settled = await db.scalar(select(func.count()).where(Transaction.status == "success"))
+                stored = await db.scalar(select(func.count()).select_from(WebhookEvent))
+
+    print(f"deliveries:     {len(bodies)} ({args.events} unique)")
+    print(f"events stored:  {stored}")
+    print(f"settled:        {settled}")
+    print(f"ingest:         {ingested:.2f} s ({len(bodies) / ingested:.0f} deliveries/s)")
+    print(f"fully settled:  {drained:.2f} s ({args.events / drained:.0f} events/s)")
+    if settled != args.events:
+        raise SystemExit("FAIL: not every transaction was settled")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="fraction of events delivered twice")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--database-url", default="sqlite:///./webhook_bench.db")
+    asyncio.run(main(parser.parse_args()))
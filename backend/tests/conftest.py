@@ -0,0 +1,114 @@
+"""
+Shared fixtures. Tests run against a scratch SQLite database unless
+TEST_DATABASE_URL names another one, whose tables are dropped and
+recreated for every test. Cases marked postgres only run when it is
+PostgreSQL.
+"""
+import os
+import tempfile
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+ADMIN_PHONE = "0799000000"
+
+# Read by the app at import time
+os.environ.update(
+    DATABASE_URL=TEST_DATABASE_URL,
+    SECRET_KEY="test-secret-key-0123456789abcdef0123456789",
+    PAYSTACK_SECRET_KEY="sk_test_stub",
+    ADMIN_PHONES=ADMIN_PHONE,
+    WEBHOOK_CONSUMER_ENABLED="false",
+    PAYSTACK_VERIFY_RETRIES="0",
+    BCRYPT_ROUNDS="4",
+)
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app.main import app
+from app.services.paystack_service import paystack_service
+from app.utils.auth import token_cache, user_cache
+from app.utils.database import AsyncSessionLocal, Base, async_engine, engine
+from benchmarks.paystack_stub import PaystackStub
+
+
+def pytest_collection_modifyitems(config, items):
+    if engine.dialect.name == "postgresql":
+        return
+    skip = pytest.mark.skip(reason="needs TEST_DATABASE_URL to point at PostgreSQL")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    user_cache.clear()
+    token_cache.clear()
+    yield engine
+    # Pooled connections belong to this test's event loop
+    await async_engine.dispose()
+    engine.dispose()
+
+
+@pytest.fixture
+async def db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+async def stub():
+    async with PaystackStub() as stub:
+        paystack_service.base_url = stub.base_url
+        yield stub
+
+
+@pytest.fixture
+async def client(stub):
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+
+async def register(client, phone: str) -> dict:
+    """Authorization headers for a newly registered user"""
+    response = await client.post("/api/auth/register", json={
+        "phone": phone, "id_number": f"ID{phone}", "password": "test-password"
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+async def borrower(client) -> dict:
+    return await register(client, "0700000001")
+
+
+@pytest.fixture
+async def admin(client) -> dict:
+    return await register(client, ADMIN_PHONE)
+
+
+@pytest.fixture
+async def payment(client, borrower) -> dict:
+    """A 5,000 loan for the borrower and its pending repayment"""
+    loan = (await client.post("/api/loans/apply", json={"amount": 5000}, headers=borrower)).json()
+    payment = (await client.post("/api/payments/initialize", json={"loan_id": loan["id"]}, headers=borrower)).json()
+    return {"loan": loan, "reference": payment["reference"]}
+
+
+@pytest.fixture
+def statements():
+    """SQL statements sent on the async engine while the test runs"""
+    sent = []
+
+    def record(conn, cursor, statement, *args):
+        sent.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield sent
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
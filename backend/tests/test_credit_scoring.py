@@ -0,0 +1,53 @@
+"""
+Settlement rescoring agrees with a rescore of the committed loans.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.credit_scoring import rescore_users
+from app.services.settlement import settle_references
+
+
+async def test_settlement_scores_the_loans_it_repays(database, db):
+    now = datetime.now(timezone.utc)
+    with database.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": user_id, "phone": f"070000000{user_id}", "id_number": f"SCORE{user_id}", "password_hash": "x", "loan_limit": 5000}
+            for user_id in (1, 2, 3)
+        ])
+        # 1: two earlier repayments, one late; 2: a first loan; 3: two late repayments
+        history = [
+            (1, 5000, "repaid", now - timedelta(days=90), now - timedelta(days=80)),
+            (1, 8000, "repaid", now - timedelta(days=70), now - timedelta(days=20)),
+            (3, 5000, "repaid", now - timedelta(days=200), now - timedelta(days=150)),
+            (3, 5000, "repaid", now - timedelta(days=120), now - timedelta(days=60)),
+        ]
+        conn.execute(insert(Loan), [
+            {"user_id": user_id, "amount": amount, "fee": 350, "total": amount + 350, "duration": 30,
+             "status": status, "created_at": created_at, "updated_at": updated_at}
+            for user_id, amount, status, created_at, updated_at in history
+        ])
+        for user_id in (1, 2, 3):
+            loan_id = conn.scalar(insert(Loan).values(
+                user_id=user_id, amount=10000, fee=550, total=10550, duration=30, status="approved",
+                created_at=now - timedelta(days=5)
+            ).returning(Loan.id))
+            conn.execute(insert(Transaction).values(
+                loan_id=loan_id, amount=10550, reference=f"SCORE_{user_id}", status="pending"
+            ))
+
+    settlement = await settle_references(db, ["SCORE_1", "SCORE_2", "SCORE_3"])
+    await db.commit()
+
+    assert sorted(settlement.references) == ["SCORE_1", "SCORE_2", "SCORE_3"]
+    limits = dict((await db.execute(select(User.phone, User.loan_limit))).all())
+    assert sorted(settlement.phones) == sorted(phone for phone, limit in limits.items() if limit != 5000)
+    assert limits["0700000001"] > limits["0700000002"] > 5000
+    # Under half repaid on time: held at the current limit
+    assert limits["0700000003"] == 5000
+    # Scoring the committed rows again changes nothing
+    assert await rescore_users(db, {1, 2, 3}) == []
@@ -0,0 +1,105 @@
+"""
+The admin export filters by status and inclusive dates, and streams in
+batches whatever the number of rows.
+"""
+import csv
+import io
+import json
+import tracemalloc
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select, text
+
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.routers.admin import EXPORT_BATCH_SIZE, ExportFormat, _export_rows
+
+COLUMNS = [column.key for column in Transaction.__table__.columns]
+
+
+def seed_loan(engine) -> int:
+    with engine.begin() as conn:
+        user_id = conn.scalar(insert(User).values(phone="0700000001", id_number="EXPORT1", password_hash="x").returning(User.id))
+        return conn.scalar(insert(Loan).values(user_id=user_id, amount=5000, fee=350, total=5350, status="repaid").returning(Loan.id))
+
+
+def seed_transactions(engine, loan_id: int, first: int, last: int):
+    metadata = "'{\"loan_id\": 1, \"payment_method\": \"mpesa\"}'"
+    if engine.dialect.name == "postgresql":
+        series = "SELECT generate_series(:first, :last) AS n"
+        metadata += "::json"
+    else:
+        series = "WITH RECURSIVE s(n) AS (SELECT :first UNION ALL SELECT n + 1 FROM s WHERE n < :last) SELECT n FROM s"
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO transactions (loan_id, amount, type, reference, status, transaction_metadata, created_at) "
+            f"SELECT :loan_id, 5350, 'payment', 'EXPORT_' || n, 'success', {metadata}, CURRENT_TIMESTAMP "
+            f"FROM ({series}) AS series"
+        ), {"first": first, "last": last, "loan_id": loan_id})
+
+
+async def export_references(client, headers, **params) -> list[str]:
+    response = await client.get("/api/admin/export/transactions", params=params, headers=headers)
+    assert response.status_code == 200
+    return [json.loads(line)["reference"] for line in response.text.splitlines()]
+
+
+async def test_end_date_is_inclusive_to_the_last_microsecond(client, admin, database):
+    loan_id = seed_loan(database)
+    times = {
+        "BEFORE": datetime(2026, 3, 31, 23, 59, 59, 999999, tzinfo=timezone.utc),
+        "FIRST": datetime(2026, 4, 1, 0, 0, 0, 0, tzinfo=timezone.utc),
+        "LAST": datetime(2026, 4, 2, 23, 59, 59, 999999, tzinfo=timezone.utc),
+        "AFTER": datetime(2026, 4, 3, 0, 0, 0, 0, tzinfo=timezone.utc),
+    }
+    with database.begin() as conn:
+        conn.execute(insert(Transaction), [
+            {"loan_id": loan_id, "amount": 5350, "reference": reference, "status": "success", "created_at": created_at}
+            for reference, created_at in times.items()
+        ])
+
+    assert await export_references(client, admin, start="2026-04-01", end="2026-04-02") == ["FIRST", "LAST"]
+    assert await export_references(client, admin, end="2026-04-02") == ["BEFORE", "FIRST", "LAST"]
+
+
+async def test_status_filter_and_csv(client, admin, database):
+    loan_id = seed_loan(database)
+    with database.begin() as conn:
+        conn.execute(insert(Transaction), [
+            {"loan_id": loan_id, "amount": 5350, "reference": f"REF_{n}", "status": status}
+            for n, status in enumerate(["success", "failed", "success", "pending"])
+        ])
+
+    assert await export_references(client, admin, status="success") == ["REF_0", "REF_2"]
+    response = await client.get(
+        "/api/admin/export/transactions", params={"format": "csv", "status": "failed"}, headers=admin
+    )
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == COLUMNS
+    assert [row[COLUMNS.index("reference")] for row in rows[1:]] == ["REF_1"]
+
+
+async def peak_export_memory(export_format: ExportFormat) -> tuple[int, int]:
+    """Rows exported and the peak Python allocation while streaming them"""
+    query = select(*[getattr(Transaction, name) for name in COLUMNS]).order_by(Transaction.id)
+    lines = 0
+    tracemalloc.start()
+    try:
+        async for chunk in _export_rows(query, COLUMNS, export_format):
+            lines += chunk.count("\n")
+        return lines, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def test_export_memory_does_not_grow_with_rows(database):
+    loan_id = seed_loan(database)
+    seed_transactions(database, loan_id, 1, 2 * EXPORT_BATCH_SIZE)
+    rows, small = await peak_export_memory(ExportFormat.ndjson)
+    assert rows == 2 * EXPORT_BATCH_SIZE
+
+    seed_transactions(database, loan_id, 2 * EXPORT_BATCH_SIZE + 1, 10 * EXPORT_BATCH_SIZE)
+    rows, large = await peak_export_memory(ExportFormat.ndjson)
+    assert rows == 10 * EXPORT_BATCH_SIZE
+    assert large < 1.5 * small
@@ -0,0 +1,103 @@
+"""
+The loan and transaction access paths must not plan as sequential scans.
+"""
+import json
+
+import pytest
+from sqlalchemy import func, insert, select, text
+
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.routers.loan import LOAN_RESPONSE_COLUMNS
+from app.routers.payments import TRANSACTION_RESPONSE_COLUMNS
+from app.utils.pagination import DEFAULT_PAGE_SIZE, encode_cursor, keyset_page, versioned_page
+
+USERS = 2000
+LOANS_PER_USER = 10
+CHECKED_TABLES = {"loans", "transactions"}
+
+
+def seq_scans(plan: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in CHECKED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found += seq_scans(child)
+    return found
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "phone": f"07{i:08d}", "id_number": f"ID{i}", "password_hash": "x"}
+            for i in range(1, USERS + 1)
+        ])
+        conn.execute(insert(Loan), [
+            {
+                "user_id": user_id, "amount": 5000, "fee": 350, "total": 5350,
+                "status": "approved" if n == LOANS_PER_USER - 1 else "repaid",
+            }
+            for user_id in range(1, USERS + 1)
+            for n in range(LOANS_PER_USER)
+        ])
+        conn.execute(text(
+            "INSERT INTO transactions (loan_id, amount, reference, status) "
+            "SELECT id, total, 'REF_' || id, 'success' FROM loans"
+        ))
+        conn.execute(text("ANALYZE"))
+
+
+def route_queries(engine) -> dict:
+    """The queries the listing and verify routes run, built with the same helpers"""
+    user_id = USERS // 2
+    with engine.connect() as conn:
+        newest = conn.execute(
+            select(Loan.created_at, Loan.id).where(Loan.user_id == user_id).order_by(Loan.id.desc())
+        ).first()
+    cursor = encode_cursor(newest.created_at, newest.id)
+    loans_for_user = select(*LOAN_RESPONSE_COLUMNS).where(Loan.user_id == user_id)
+    transactions_for_user = select(*TRANSACTION_RESPONSE_COLUMNS).join(
+        Loan, Loan.id == Transaction.loan_id
+    ).where(Loan.user_id == user_id)
+    loans_version = select(func.count(Loan.id), func.max(Loan.id)).where(Loan.user_id == user_id)
+    transactions_version = select(func.count(Transaction.id)).join(
+        Loan, Loan.id == Transaction.loan_id
+    ).where(Loan.user_id == user_id)
+    return {
+        "loan history version": loans_version,
+        "loan history page": keyset_page(loans_for_user, Loan.created_at, Loan.id, None, DEFAULT_PAGE_SIZE),
+        "loan history next page": keyset_page(loans_for_user, Loan.created_at, Loan.id, cursor, DEFAULT_PAGE_SIZE),
+        "loan history versioned page": versioned_page(
+            loans_version, loans_for_user, Loan.created_at, Loan.id, None, DEFAULT_PAGE_SIZE
+        ),
+        "transactions version": transactions_version,
+        "transactions page": keyset_page(
+            transactions_for_user, Transaction.created_at, Transaction.id, None, DEFAULT_PAGE_SIZE
+        ),
+        "transactions next page": keyset_page(
+            transactions_for_user, Transaction.created_at, Transaction.id, cursor, DEFAULT_PAGE_SIZE
+        ),
+        "transactions versioned page": versioned_page(
+            transactions_version, transactions_for_user, Transaction.created_at, Transaction.id, cursor, DEFAULT_PAGE_SIZE
+        ),
+        "transaction by reference": select(Transaction.status, Transaction.amount, Loan.user_id).join(
+            Loan, Loan.id == Transaction.loan_id
+        ).where(Transaction.reference == f"REF_{newest.id}"),
+    }
+
+
+@pytest.mark.postgres
+def test_route_queries_use_indexes(database):
+    seed(database)
+    regressed = {}
+    with database.connect() as conn:
+        for name, query in route_queries(database).items():
+            sql = str(query.compile(database, compile_kwargs={"literal_binds": True}))
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = seq_scans(plan[0]["Plan"])
+            if scans:
+                regressed[name] = scans
+    assert regressed == {}
@@ -0,0 +1,85 @@
+"""
+Keyset walks over the listings return every row exactly once, newest first,
+across database-written timestamps, microsecond timestamps and ties.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.utils.auth import create_access_token
+
+ROWS = 30
+PAGE_SIZE = 2
+LISTINGS = [
+    ("/api/loans/history", "loans"),
+    ("/api/payments/transactions", "transactions"),
+    ("/api/admin/transactions", "transactions"),
+]
+
+
+def created_at(n: int):
+    """
+    None (the database's now()) for the first third; then times inside one
+    millisecond that run backwards as ids go up; then one shared time
+    """
+    if n <= ROWS // 3:
+        return None
+    if n <= 2 * ROWS // 3:
+        return datetime(2026, 1, 1, 12, 0, 0, 900) - timedelta(microseconds=37 * n)
+    return datetime(2026, 1, 1, 9, 30, 0, 250000)
+
+
+@pytest.fixture
+def headers(database) -> dict:
+    # The admin listing needs an admin; the same user owns every row
+    phone = os.environ["ADMIN_PHONES"]
+    with database.begin() as conn:
+        conn.execute(insert(User).values(id=1, phone=phone, id_number="WALK1", password_hash="x", loan_limit=5000))
+        for n in range(1, ROWS + 1):
+            timestamp = {"created_at": created_at(n)} if created_at(n) else {}
+            conn.execute(insert(Loan).values(
+                id=n, user_id=1, amount=5000, fee=350, total=5350, status="repaid", **timestamp
+            ))
+            conn.execute(insert(Transaction).values(
+                id=n, loan_id=n, amount=5350, reference=f"LOAN_{n}_WALK", status="success", **timestamp
+            ))
+    return {"Authorization": f"Bearer {create_access_token({'sub': phone})}"}
+
+
+@pytest.mark.parametrize("path, key", LISTINGS)
+async def test_walk_returns_every_row_once_in_order(client, headers, path, key):
+    rows, cursor = [], None
+    for _ in range(ROWS // PAGE_SIZE + 2):
+        params = {"limit": PAGE_SIZE, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(path, params=params, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        rows += body[key]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert cursor is None, "still paging"
+
+    ids = [row["id"] for row in rows]
+    assert sorted(ids) == list(range(1, ROWS + 1))
+    newest_first = sorted(rows, key=lambda row: (datetime.fromisoformat(row["created_at"]), row["id"]), reverse=True)
+    assert ids == [row["id"] for row in newest_first]
+
+
+@pytest.mark.parametrize("path, key", LISTINGS[:2])
+async def test_listing_revalidates_and_handles_no_rows(client, borrower, path, key):
+    response = await client.get(path, headers=borrower)
+    assert response.json()[key] == [] and response.json()["next_cursor"] is None
+
+    revalidated = await client.get(path, headers={**borrower, "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    loan = (await client.post("/api/loans/apply", json={"amount": 5000}, headers=borrower)).json()
+    await client.post("/api/payments/initialize", json={"loan_id": loan["id"]}, headers=borrower)
+    changed = await client.get(path, headers={**borrower, "If-None-Match": response.headers["ETag"]})
+    assert changed.status_code == 200 and changed.headers["ETag"] != response.headers["ETag"]
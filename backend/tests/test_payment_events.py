@@ -0,0 +1,28 @@
+import asyncio
+
+from sqlalchemy import update
+
+from app.models.transaction import Transaction
+from app.services.payment_events import broker
+
+
+async def test_refresh_wakes_waiters_with_one_query(client, borrower, payment, db, statements):
+    waiters = [
+        asyncio.create_task(client.get(f"/api/payments/status/{payment['reference']}?wait=10", headers=borrower))
+        for _ in range(20)
+    ]
+    while broker.stats()["waiters"] < len(waiters):
+        await asyncio.sleep(0.01)
+
+    # Settled while nobody was listening: no notification reaches the broker
+    await db.execute(
+        update(Transaction).where(Transaction.reference == payment["reference"]).values(status="success")
+    )
+    await db.commit()
+
+    statements.clear()
+    await broker.refresh()
+    assert len(statements) == 1
+
+    responses = await asyncio.wait_for(asyncio.gather(*waiters), timeout=5)
+    assert all(response.json()["status"] == "success" for response in responses)
@@ -0,0 +1,23 @@
+import asyncio
+
+from app.services.paystack_service import PAYSTACK_MAX_CONNECTIONS, PaystackService
+
+
+async def test_connection_count_stays_flat(stub):
+    service = PaystackService()
+    service.base_url = stub.base_url
+    await service.start()
+    semaphore = asyncio.Semaphore(10)
+
+    async def verify(i: int):
+        async with semaphore:
+            return await service.verify_transaction(f"REF_{i}")
+
+    try:
+        results = await asyncio.gather(*[verify(i) for i in range(1000)])
+    finally:
+        await service.close()
+
+    assert all(result["success"] for result in results)
+    assert stub.connections <= min(10, PAYSTACK_MAX_CONNECTIONS)
+    assert service.stats()["connection_reuse_rate"] >= 0.99
@@ -0,0 +1,33 @@
+"""
+The bucketed portfolio summary adds up to the loans table.
+"""
+import asyncio
+
+from app.services.portfolio import rebuild_portfolio
+
+from conftest import register
+
+BORROWERS = 12
+
+
+async def test_summary_matches_loans_after_concurrent_writes(client, admin, stub, db):
+    headers = [await register(client, f"07000001{n:02d}") for n in range(BORROWERS)]
+    loans = await asyncio.gather(*[
+        client.post("/api/loans/apply", json={"amount": 5000}, headers=borrower) for borrower in headers
+    ])
+    payments = await asyncio.gather(*[
+        client.post("/api/payments/initialize", json={"loan_id": loan.json()["id"]}, headers=borrower)
+        for loan, borrower in zip(loans[::2], headers[::2])
+    ])
+    await asyncio.gather(*[
+        client.get(f"/api/payments/verify/{payment.json()['reference']}", headers=borrower)
+        for payment, borrower in zip(payments, headers[::2])
+    ])
+
+    assert await rebuild_portfolio(db, check_only=True) == []
+    summary = (await client.get("/api/admin/portfolio", headers=admin)).json()
+    assert summary["loan_count"] == BORROWERS
+    assert summary["repaid_count"] == BORROWERS // 2
+    assert {(day["status"], day["loan_count"]) for day in summary["days"]} == {
+        ("approved", BORROWERS // 2), ("repaid", BORROWERS // 2)
+    }
@@ -0,0 +1,64 @@
+"""
+Statements each hot endpoint sends to the database, with the user lookup
+already cached. Budgets are for PostgreSQL, where every statement is a
+network round trip; SQLite has no data-modifying CTEs, so settling there
+takes a statement per step, all in-process, and only the listings are
+held to their budgets on both.
+"""
+import pytest
+from sqlalchemy import update
+
+from app.models.user import User
+
+BUDGETS = {
+    # Version probe and page together
+    "GET /api/payments/transactions": 1,
+    "GET /api/loans/history": 1,
+    # The probe alone answers a matching If-None-Match
+    "revalidated listing": 1,
+    # The ownership and status read, which must happen before Paystack is
+    # asked, then the settlement itself
+    "GET /api/payments/verify/{reference}": 2,
+    # Plus the loan-limit UPDATE: limits are scored in NumPy from the rows the
+    # settlement returns, so a changed one is written back separately
+    "GET /api/payments/verify/{reference} raising the limit": 3,
+}
+
+
+async def count(client, statements, path: str, headers: dict):
+    statements.clear()
+    response = await client.get(path, headers=headers)
+    assert response.status_code in (200, 304)
+    return len(statements), response
+
+
+@pytest.mark.parametrize("path", ["/api/payments/transactions", "/api/loans/history"])
+async def test_listing(client, borrower, payment, statements, path):
+    await client.get("/api/auth/me", headers=borrower)
+
+    sent, response = await count(client, statements, path, borrower)
+    assert sent <= BUDGETS[f"GET {path}"], statements
+    sent, response = await count(client, statements, path, {**borrower, "If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert sent <= BUDGETS["revalidated listing"], statements
+
+
+@pytest.mark.postgres
+async def test_verify_raising_the_limit(client, borrower, payment, statements):
+    await client.get("/api/auth/me", headers=borrower)
+
+    sent, response = await count(client, statements, f"/api/payments/verify/{payment['reference']}", borrower)
+    assert response.json()["status"] == "success"
+    assert sent <= BUDGETS["GET /api/payments/verify/{reference} raising the limit"], statements
+
+
+@pytest.mark.postgres
+async def test_verify(client, borrower, payment, statements, db):
+    # Already at the limit a first repayment earns, so scoring changes nothing
+    await db.execute(update(User).values(loan_limit=7500))
+    await db.commit()
+    await client.get("/api/auth/me", headers=borrower)
+
+    sent, response = await count(client, statements, f"/api/payments/verify/{payment['reference']}", borrower)
+    assert response.json()["status"] == "success"
+    assert sent <= BUDGETS["GET /api/payments/verify/{reference}"], statements
@@ -0,0 +1,66 @@
+"""
+Settlement applies a payment once, and verify only reports what was applied.
+"""
+import asyncio
+
+from sqlalchemy import insert, select
+
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.settlement import settle_references
+from app.utils.database import AsyncSessionLocal
+
+SETTLEMENTS = 50
+
+
+async def test_concurrent_settlements_apply_once(database, db):
+    with database.begin() as conn:
+        conn.execute(insert(User).values(id=1, phone="0700000001", id_number="RACE1", password_hash="x", loan_limit=5000))
+        conn.execute(insert(Loan).values(id=1, user_id=1, amount=5000, fee=350, total=5350, status="approved"))
+        conn.execute(insert(Transaction).values(loan_id=1, amount=5350, reference="LOAN_1_RACE", status="pending"))
+    start = asyncio.Event()
+
+    async def settle() -> bool:
+        async with AsyncSessionLocal() as session:
+            await start.wait()
+            settlement = await settle_references(session, ["LOAN_1_RACE"])
+            await session.commit()
+            return bool(settlement.references)
+
+    tasks = [asyncio.create_task(settle()) for _ in range(SETTLEMENTS)]
+    await asyncio.sleep(0.1)
+    start.set()
+    results = await asyncio.gather(*tasks)
+
+    assert results.count(True) == 1
+    assert await db.scalar(select(Loan.status).where(Loan.id == 1)) == "repaid"
+    assert await db.scalar(select(User.loan_limit).where(User.id == 1)) > 5000
+
+
+async def statuses(db, reference: str) -> tuple:
+    return (await db.execute(
+        select(Transaction.status, Loan.status).join(Loan, Loan.id == Transaction.loan_id)
+        .where(Transaction.reference == reference)
+    )).one()._tuple()
+
+
+async def test_verify_error_leaves_payment_pending(client, borrower, payment, stub, db):
+    stub.error_status = 503
+    response = await client.get(f"/api/payments/verify/{payment['reference']}", headers=borrower)
+    assert response.json()["status"] == "pending"
+    assert await statuses(db, payment["reference"]) == ("pending", "approved")
+
+
+async def test_verify_settles_a_payment_marked_failed(client, borrower, payment, stub, db):
+    reference = payment["reference"]
+    stub.failing_references.add(reference)
+    response = await client.get(f"/api/payments/verify/{reference}", headers=borrower)
+    assert response.json()["status"] == "failed"
+    assert await statuses(db, reference) == ("failed", "approved")
+
+    stub.failing_references.clear()
+    response = await client.get(f"/api/payments/verify/{reference}", headers=borrower)
+    assert response.json()["status"] == "success"
+    db.expire_all()
+    assert await statuses(db, reference) == ("success", "repaid")
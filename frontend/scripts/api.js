@@ -26,12 +26,33 @@ const API = {
             headers['Authorization'] = `Bearer ${this.getToken()}`;
         }
 
+        // Keeps our reads on the primary right after we write, whichever worker answers
+        const lastWrite = sessionStorage.getItem('last_write');
+        if (lastWrite) {
+            headers['X-Last-Write'] = lastWrite;
+        }
+
+        const isGet = !options.method || options.method === 'GET';
+        const cached = isGet ? this.getCachedResponse(endpoint) : null;
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+        }
+
         try {
             const response = await fetch(url, {
                 ...options,
                 headers
             });
 
+            const lastWriteHeader = response.headers.get('X-Last-Write');
+            if (lastWriteHeader) {
+                sessionStorage.setItem('last_write', lastWriteHeader);
+            }
+
+            if (response.status === 304 && cached) {
+                return cached.data;
+            }
+
             if (response.status === 401 && !options.isRetry) {
                 const refreshed = await this.refreshToken();
                 if (refreshed) {
@@ -50,6 +71,11 @@ const API = {
                 throw new Error(data.detail || 'An error occurred');
             }
 
+            const etag = response.headers.get('ETag');
+            if (isGet && etag) {
+                this.setCachedResponse(endpoint, etag, data);
+            }
+
             return data;
         } catch (error) {
             if (error.name === 'TypeError' && error.message === 'Failed to fetch') {
@@ -59,6 +85,22 @@ const API = {
         }
     },
 
+    getCachedResponse(endpoint) {
+        try {
+            return JSON.parse(sessionStorage.getItem(`etag:${endpoint}`));
+        } catch {
+            return null;
+        }
+    },
+
+    setCachedResponse(endpoint, etag, data) {
+        try {
+            sessionStorage.setItem(`etag:${endpoint}`, JSON.stringify({ etag, data }));
+        } catch {
+            // Storage full or unavailable; the next request simply fetches in full
+        }
+    },
+
     async refreshToken() {
         const refreshToken = this.getRefreshToken();
         if (!refreshToken) return false;
@@ -109,6 +151,29 @@ const API = {
         });
     },
 
+    async getFeeSchedule() {
+        if (!this._feeSchedule) {
+            this._feeSchedule = this.request('/api/loans/fee-schedule', { noAuth: true })
+                .catch(error => {
+                    this._feeSchedule = null;
+                    throw error;
+                });
+        }
+        return this._feeSchedule;
+    },
+
+    quoteFromSchedule(schedule, principal) {
+        if (principal < schedule.min_principal || principal > schedule.max_principal) {
+            return null;
+        }
+        let fee = schedule.tiers[0].fee;
+        for (const tier of schedule.tiers) {
+            if (principal < tier.min_principal) break;
+            fee = tier.fee;
+        }
+        return { principal, fee, total_repayable: principal + fee };
+    },
+
     async applyLoan(amount) {
         return this.request('/api/loans/apply', {
             method: 'POST',
@@ -116,8 +181,16 @@ const API = {
         });
     },
 
-    async getLoanHistory() {
-        return this.request('/api/loans/history');
+    pageQuery(cursor, limit) {
+        const params = new URLSearchParams();
+        if (cursor) params.set('cursor', cursor);
+        if (limit) params.set('limit', limit);
+        const query = params.toString();
+        return query ? `?${query}` : '';
+    },
+
+    async getLoanHistory(cursor = null, limit = null) {
+        return this.request(`/api/loans/history${this.pageQuery(cursor, limit)}`);
     },
 
     async getLoan(loanId) {
@@ -139,8 +212,13 @@ const API = {
         return this.request(`/api/payments/verify/${reference}`);
     },
 
-    async getTransactions() {
-        return this.request('/api/payments/transactions');
+    // Long poll: answers as soon as the status changes, or with 'pending' after `wait` seconds
+    async getPaymentStatus(reference, wait = 25) {
+        return this.request(`/api/payments/status/${reference}?wait=${wait}`);
+    },
+
+    async getTransactions(cursor = null, limit = null) {
+        return this.request(`/api/payments/transactions${this.pageQuery(cursor, limit)}`);
     }
 };
 